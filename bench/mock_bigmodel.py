@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@File    :   mock_bigmodel.py
+@Time    :   2025/09/28 10:20:14
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   本地 BigModel 接口替身，用于离线压测
+
+    python bench/mock_bigmodel.py --port 5900 --images-latency lognormal:8000:0.3 --error-rate 0.02
+
+    延迟分布写法（毫秒）：fixed:200 / uniform:100:300 / lognormal:<中位数>:<sigma>
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+
+class Latency:
+    """
+    @name     : Latency
+    @desc     : 解析并采样延迟分布，单位秒
+    """
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params]
+        if kind == "fixed":
+            self.params = (values[0] / 1000,)
+        elif kind == "uniform":
+            self.params = (values[0] / 1000, values[1] / 1000)
+        elif kind == "lognormal":
+            # sigma 是无量纲的形状参数，不做毫秒换算
+            self.params = (values[0] / 1000, values[1])
+        else:
+            raise ValueError(f"unknown latency distribution: {spec}")
+        self.kind = kind
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return random.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return random.lognormvariate(0, sigma) * median
+
+
+class MockBigModel:
+    """
+    @name     : MockBigModel
+    @desc     : /tools、/chat/completions（含流式）、/images/generations 三个接口，以及生图链接指向的 /files
+    """
+
+    def __init__(self, tools: Latency, chat: Latency, images: Latency, error_rate: float, scenes: int, image_bytes: int = 200 * 1024):
+        self.latency = {"tools": tools, "chat": chat, "images": images}
+        self.error_rate = error_rate
+        self.scenes = scenes
+        self.image_bytes = image_bytes
+        self.counts = {"tools": 0, "chat": 0, "images": 0, "files": 0, "errors": 0}
+
+    def _fail(self):
+        if random.random() < self.error_rate:
+            self.counts["errors"] += 1
+            status = random.choice((429, 500, 503))
+            return JSONResponse({"error": {"code": str(status), "message": "mock error"}}, status_code=status)
+        return None
+
+    async def tools(self, request: Request):
+        self.counts["tools"] += 1
+        body = await request.json()
+        await asyncio.sleep(self.latency["tools"].sample())
+        error = self._fail()
+        if error:
+            return error
+        query = body["messages"][-1]["content"]
+        results = [
+            {
+                "index": i,
+                "title": f"{query} - 来源 {i + 1}",
+                "link": f"https://mock.search.local/{uuid.uuid4().hex}",
+                "content": f"关于{query}的第 {i + 1} 条结果。" + "这是一段与查询无关的填充内容。" * 5 + f"{query}的补充说明。",
+                "refer": f"ref_{i + 1}",
+            }
+            for i in range(5)
+        ]
+        return JSONResponse({
+            "id": uuid.uuid4().hex,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "tool",
+                    "tool_calls": [
+                        {"id": uuid.uuid4().hex, "type": "search_intent", "search_intent": [{"index": 0, "query": query}]},
+                        {"id": uuid.uuid4().hex, "type": "search_result", "search_result": results},
+                    ],
+                },
+            }],
+        })
+
+    def _story(self) -> str:
+        return json.dumps({
+            "list": [
+                {"text": f"第 {i + 1} 幕的故事内容。" * 5, "image_prompt": f"A mock illustration of scene {i + 1}"}
+                for i in range(self.scenes)
+            ]
+        }, ensure_ascii=False)
+
+    async def chat(self, request: Request):
+        self.counts["chat"] += 1
+        body = await request.json()
+        total = self.latency["chat"].sample()
+        if not body.get("stream"):
+            await asyncio.sleep(total)
+            error = self._fail()
+            if error:
+                return error
+            return JSONResponse({
+                "id": uuid.uuid4().hex,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self._story()},
+                    "finish_reason": "stop",
+                }],
+            })
+
+        # 流式：30% 的时间用于首 token，其余均匀分布在各分片之间
+        await asyncio.sleep(total * 0.3)
+        error = self._fail()
+        if error:
+            return error
+        content = self._story()
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+        interval = total * 0.7 / max(len(pieces), 1)
+
+        async def events():
+            cid = uuid.uuid4().hex
+            for piece in pieces:
+                chunk = {
+                    "id": cid,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(interval)
+            done = {
+                "id": cid,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def images(self, request: Request):
+        self.counts["images"] += 1
+        await request.json()
+        await asyncio.sleep(self.latency["images"].sample())
+        error = self._fail()
+        if error:
+            return error
+        expires = int(time.time()) + 86400
+        base = str(request.base_url).rstrip("/")
+        return JSONResponse({
+            "created": int(time.time()),
+            "data": [{"url": f"{base}/files/{uuid.uuid4().hex}.png?Signature=mock&Expires={expires}"}],
+        })
+
+    async def files(self, request: Request):
+        """签名链接指向的图片内容：PNG 文件头 + 由文件名决定的伪随机字节"""
+        self.counts["files"] += 1
+        body = b"\x89PNG\r\n\x1a\n" + random.Random(request.path_params["name"]).randbytes(self.image_bytes)
+        return Response(body, media_type="image/png")
+
+    async def stats(self, request: Request):
+        return JSONResponse(self.counts)
+
+    def app(self, prefix: str = "/api/paas/v4") -> Starlette:
+        return Starlette(routes=[
+            Route(f"{prefix}/tools", self.tools, methods=["POST"]),
+            Route(f"{prefix}/chat/completions", self.chat, methods=["POST"]),
+            Route(f"{prefix}/images/generations", self.images, methods=["POST"]),
+            Route("/files/{name}", self.files, methods=["GET"]),
+            Route("/stats", self.stats, methods=["GET"]),
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock BigModel API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5900)
+    parser.add_argument("--tools-latency", default="lognormal:1500:0.4")
+    parser.add_argument("--chat-latency", default="lognormal:4000:0.3")
+    parser.add_argument("--images-latency", default="lognormal:8000:0.25")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--scenes", type=int, default=3)
+    parser.add_argument("--image-bytes", type=int, default=200 * 1024, help="/files 返回的图片大小")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    mock = MockBigModel(
+        Latency(args.tools_latency),
+        Latency(args.chat_latency),
+        Latency(args.images_latency),
+        args.error_rate,
+        args.scenes,
+        args.image_bytes,
+    )
+    uvicorn.run(mock.app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
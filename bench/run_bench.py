@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@File    :   run_bench.py
+@Time    :   2025/09/28 14:47:52
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   离线压测：启动 mock BigModel 与 main.py，经 clients/ 的 MCPClient 以开环方式按目标 QPS 发压
+
+    python bench/run_bench.py --transport stdio sse --tools web_search add --qps 5 --duration 20
+    python bench/run_bench.py --compare bench/results/<旧结果>.json
+    python bench/run_bench.py --transport sse --admission --sessions 4   # 保留准入控制，被拒绝的请求单独计数
+
+    开环：请求按泊松到达时间发出，不等待前一个请求完成；延迟从计划发出时刻算起，排队时间也计入。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "clients"))
+
+from mcp_client import MCPClient, MCPClientPool, busy_retry_after  # noqa: E402
+
+logger = logging.getLogger("bench")
+
+SCENARIOS = {
+    "web_search": lambda i: {"query": f"bench query {i}"},
+    "add": lambda i: {"a": i, "b": 1},
+    "batch_reduce": lambda i: {"op": "mean", "values": list(range(i % 100 + 1))},
+    "get_story_prompt": lambda i: {"story_theme": f"bench theme {i}"},
+    "generate_story": lambda i: {"story_prompt": f"bench story {i}"},
+    "generate_image": lambda i: {"images_prompts": [f"bench scene {i}"]},
+    "generate_illustrated_story": lambda i: {"story_theme": f"bench theme {i}"},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"port {port} not ready after {timeout}s")
+
+
+def server_env(args, mock_port: int) -> dict:
+    env = {
+        "API_KEY": "bench",
+        "BIGMODEL_BASE_URL": f"http://127.0.0.1:{mock_port}/api/paas/v4",
+        "PYTHONUNBUFFERED": "1",
+    }
+    if not args.admission:
+        # 默认关闭准入控制，测的是服务本身的处理能力而不是满载时的快速拒绝
+        env["ADMISSION_CONTROL"] = "false"
+    if not args.cache:
+        # 默认关闭各级缓存，测的是真实上游路径
+        env.update({"SEARCH_CACHE_TTL": "0", "SEMANTIC_CACHE_SIZE": "0", "IMAGE_CACHE_DIR": ""})
+    return env
+
+
+async def call_once(client, tool: str, tool_args: dict, scheduled: float, timeout: float) -> dict:
+    loop = asyncio.get_running_loop()
+    ok = rejected = False
+    try:
+        result = await asyncio.wait_for(client.call_tool(tool, tool_args), timeout)
+        ok = not result.isError
+        rejected = busy_retry_after(result) is not None
+    except Exception as e:
+        logger.debug(f"{tool} failed: {e!r}")
+    return {"latency": loop.time() - scheduled, "ok": ok, "rejected": rejected, "finished": loop.time()}
+
+
+async def open_loop(client, tool: str, qps: float, duration: float, timeout: float) -> dict:
+    """
+    @desc     : 按泊松到达以 qps 发压 duration 秒，统计该工具的延迟分布与吞吐
+    """
+    loop = asyncio.get_running_loop()
+    make_args = SCENARIOS[tool]
+    tasks = []
+    start = loop.time()
+    scheduled = start
+    i = 0
+    while scheduled < start + duration:
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+        tasks.append(asyncio.create_task(call_once(client, tool, make_args(i), scheduled, timeout)))
+        i += 1
+        scheduled += random.expovariate(qps)
+    samples = await asyncio.gather(*tasks)
+
+    latencies = np.array([s["latency"] for s in samples if s["ok"]]) * 1000
+    ok = int(latencies.size)
+    rejected = sum(s["rejected"] for s in samples)
+    wall = max(s["finished"] for s in samples) - start if samples else duration
+    report = {
+        "tool": tool,
+        "target_qps": qps,
+        "sent": len(samples),
+        "ok": ok,
+        # 被准入控制拒绝（server busy）的请求不计入 errors
+        "rejected": rejected,
+        "errors": len(samples) - ok - rejected,
+        "throughput": ok / wall if wall > 0 else 0.0,
+    }
+    if ok:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        report.update({
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "mean_ms": float(latencies.mean()),
+            "max_ms": float(latencies.max()),
+        })
+    return report
+
+
+async def connect(transport: str, args, env: dict, procs: list):
+    """
+    @desc     : stdio 由 MCPClient 拉起子进程；sse / http 先启动服务进程，再用 MCPClientPool 连接地址
+    """
+    main_py = os.path.join(ROOT, "main.py")
+    if transport == "stdio":
+        client = MCPClient()
+        await client.connect(command=sys.executable, args=[main_py], env=env)
+        return client
+
+    port = free_port()
+    server_transport = "sse" if transport == "sse" else "streamable-http"
+    proc_env = {**os.environ, **env, "MCP_TRANSPORT": server_transport, "MCP_HOST": "127.0.0.1", "MCP_PORT": str(port)}
+    if transport == "http":
+        proc_env["MCP_WORKERS"] = str(args.workers)
+    procs.append(subprocess.Popen(
+        [sys.executable, main_py], cwd=ROOT, env=proc_env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    ))
+    await wait_port(port)
+    path = "/sse" if transport == "sse" else "/mcp"
+    client = MCPClientPool([f"http://127.0.0.1:{port}{path}"] * args.sessions)
+    await client.connect()
+    return client
+
+
+def print_table(results: list):
+    header = f"{'transport':<10}{'tool':<18}{'sent':>6}{'ok':>6}{'rej':>5}{'err':>5}{'thr/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['transport']:<10}{r['tool']:<18}{r['sent']:>6}{r['ok']:>6}{r.get('rejected', 0):>5}{r['errors']:>5}"
+            f"{r['throughput']:>8.2f}{r.get('p50_ms', 0):>9.1f}{r.get('p95_ms', 0):>9.1f}{r.get('p99_ms', 0):>9.1f}"
+        )
+
+
+def compare(results: list, baseline_path: str):
+    """
+    @desc     : 与历史结果对比，打印各分位与吞吐的相对变化
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["transport"], r["tool"]): r for r in json.load(f)["results"]}
+    print(f"\ncompare with {baseline_path}")
+    for r in results:
+        old = baseline.get((r["transport"], r["tool"]))
+        if old is None:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput"):
+            if old.get(key) and r.get(key) is not None:
+                deltas.append(f"{key} {(r[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"  {r['transport']:<10}{r['tool']:<18}" + "  ".join(deltas))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def run(args) -> dict:
+    mock_port = free_port()
+    procs = [subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT, "bench", "mock_bigmodel.py"),
+            "--port", str(mock_port),
+            "--tools-latency", args.tools_latency,
+            "--chat-latency", args.chat_latency,
+            "--images-latency", args.images_latency,
+            "--error-rate", str(args.error_rate),
+        ]
+        + (["--seed", str(args.seed)] if args.seed is not None else []),
+    )]
+    results = []
+    try:
+        await wait_port(mock_port)
+        env = server_env(args, mock_port)
+        for transport in args.transport:
+            client = await connect(transport, args, env, procs)
+            try:
+                for tool in args.tools:
+                    logger.warning(f"[{transport}] {tool}: {args.qps} qps for {args.duration}s")
+                    report = await open_loop(client, tool, args.qps, args.duration, args.timeout)
+                    results.append({"transport": transport, **report})
+            finally:
+                await client.cleanup()
+        async with httpx.AsyncClient() as http:
+            upstream_counts = (await http.get(f"http://127.0.0.1:{mock_port}/stats")).json()
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "upstream_requests": upstream_counts,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mcp-serve benchmark")
+    parser.add_argument("--transport", nargs="+", default=["stdio"], choices=["stdio", "sse", "http"])
+    parser.add_argument("--tools", nargs="+", default=["web_search", "add"], choices=list(SCENARIOS))
+    parser.add_argument("--qps", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--sessions", type=int, default=1, help="sse/http 模式下的客户端会话数")
+    parser.add_argument("--workers", type=int, default=1, help="http 模式下的服务 worker 数")
+    parser.add_argument("--cache", action="store_true", help="保留服务端缓存")
+    parser.add_argument("--admission", action="store_true", help="保留服务端准入控制（sse/http），被拒绝的请求计入 rej 列")
+    parser.add_argument("--tools-latency", default="lognormal:1500:0.4")
+    parser.add_argument("--chat-latency", default="lognormal:4000:0.3")
+    parser.add_argument("--images-latency", default="lognormal:8000:0.25")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="结果 JSON 路径，默认 bench/results/<时间>-<commit>.json")
+    parser.add_argument("--compare", default=None, help="与之对比的历史结果 JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="[%(asctime)s] %(levelname)s %(message)s")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    report = asyncio.run(run(args))
+    print_table(report["results"])
+
+    output = args.output or os.path.join(
+        ROOT, "bench", "results", f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nsaved to {output}")
+
+    if args.compare:
+        compare(report["results"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@File    :   startup_bench.py
+@Time    :   2025/09/29 21:05:33
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   服务冷启动耗时：对比延迟导入（默认）与启动时预加载重量级依赖
+
+    python bench/startup_bench.py --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "clients"))
+
+from mcp_client import MCPClient  # noqa: E402
+
+MODES = {
+    "lazy": "",
+    "eager": "openai,numpy",
+}
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def import_time(preload: str) -> float:
+    """
+    @desc     : 新进程中 import main（注册全部工具）的耗时
+    """
+    env = {**os.environ, "PRELOAD_MODULES": preload}
+    out = subprocess.check_output([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+    return float(out.decode().strip().splitlines()[-1])
+
+
+async def initialize_time(preload: str) -> float:
+    """
+    @desc     : 通过 MCPClient 拉起 stdio 服务到 initialize 完成的耗时，即短会话实际等待的冷启动时间
+    """
+    client = MCPClient()
+    started = time.perf_counter()
+    try:
+        await client.connect(
+            command=sys.executable,
+            args=[os.path.join(ROOT, "main.py")],
+            env={"PRELOAD_MODULES": preload},
+        )
+        return time.perf_counter() - started
+    finally:
+        await client.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mcp-serve cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", default=None, help="结果 JSON 路径")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    for mode, preload in MODES.items():
+        imports = [import_time(preload) for _ in range(args.runs)]
+        inits = [asyncio.run(initialize_time(preload)) for _ in range(args.runs)]
+        results.append({
+            "mode": mode,
+            "preload": preload,
+            "import_ms": statistics.median(imports) * 1000,
+            "initialize_ms": statistics.median(inits) * 1000,
+        })
+
+    print(f"{'mode':<8}{'preload':<16}{'import main (ms)':>18}{'spawn→initialize (ms)':>24}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['preload'] or '-':<16}{r['import_ms']:>18.1f}{r['initialize_ms']:>24.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@File    :   chat_server.py
+@Time    :   2025/10/05 15:42:09
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   多会话聊天服务：单进程承载大量 ChatEngine 会话，HTTP 流式与 WebSocket 两种接入
+
+    python clients/chat_server.py
+
+    POST   /conversations                    新建会话，返回 conversation_id
+    POST   /conversations/{id}/messages      {"content": "..."}，以 text/event-stream 流式返回
+    GET    /conversations/{id}               会话轮次与纯函数工具快速路径的节省统计
+    DELETE /conversations/{id}               结束会话
+    WS     /conversations/{id}/ws            发送文本，逐条收到 {"type": "token" | "done" | "error", ...}
+    GET    /stats                            会话数与淘汰统计
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from fast_path import ResultTable
+from mcp_client import ChatEngine, LLMHandler, MCPClient, MCPClientPool
+from setting import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Conversation:
+    """
+    @name     : Conversation
+    @desc     : 单个会话：独立的 ChatEngine（即独立历史），同一会话的提问串行执行
+    """
+
+    def __init__(self, conversation_id: str, engine: ChatEngine):
+        self.id = conversation_id
+        self.engine = engine
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.turns = 0
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    async def ask(self, query: str) -> AsyncIterator[str]:
+        async with self.lock:
+            self.last_active = time.monotonic()
+            self.turns += 1
+            message = {"role": "user", "content": query}
+            self.engine.messages.append(message)
+            try:
+                async for token in self.engine.stream_query(query):
+                    yield token
+            except BaseException:
+                # 客户端断开（取消）或出错时撤销本轮，历史停留在上一轮完整的回答
+                self.engine.messages.rollback(message)
+                self.turns -= 1
+                raise
+            finally:
+                self.last_active = time.monotonic()
+
+
+class ChatService:
+    """
+    @name     : ChatService
+    @desc     : 所有会话共享一个多路复用的 MCP 会话与一个 LLMHandler；
+                会话按最近活跃排序，空闲超过 CHAT_IDLE_TIMEOUT 或总数超过 CHAT_MAX_CONVERSATIONS 时淘汰最久未用的空闲会话
+    """
+
+    def __init__(self, mcp_client: MCPClient, llm_handler: LLMHandler):
+        self.mcp_client = mcp_client
+        self.llm_handler = llm_handler
+        self.conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        # 纯函数工具结果在所有会话间共享
+        self.results = ResultTable(settings.FAST_PATH_MEMO_SIZE, settings.FAST_PATH_MEMO_TTL)
+        self.created = 0
+        self.evicted = 0
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls) -> "ChatService":
+        pooled = settings.MCP_URL or settings.MCP_POOL_SIZE > 1
+        mcp_client = MCPClientPool.from_settings() if pooled else MCPClient()
+        llm_handler = LLMHandler(
+            api_key=settings.LLM_API_KEY,
+            base_url=settings.LLM_BASE_URL,
+            model=settings.LLM_MODEL,
+        )
+        return cls(mcp_client, llm_handler)
+
+    async def start(self):
+        await self.mcp_client.connect()
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+        await self.mcp_client.cleanup()
+
+    def create(self) -> Conversation:
+        conversation_id = uuid.uuid4().hex
+        conversation = Conversation(conversation_id, ChatEngine(self.mcp_client, self.llm_handler, self.results))
+        self.conversations[conversation_id] = conversation
+        self.created += 1
+        self._evict_overflow()
+        return conversation
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is not None:
+            self.conversations.move_to_end(conversation_id)
+        return conversation
+
+    def close(self, conversation_id: str) -> bool:
+        return self.conversations.pop(conversation_id, None) is not None
+
+    def _evict_overflow(self):
+        overflow = len(self.conversations) - settings.CHAT_MAX_CONVERSATIONS
+        if overflow <= 0:
+            return
+        # 从最久未用的一端开始，跳过正在回答的会话
+        for conversation_id in [c.id for c in self.conversations.values() if not c.busy][:overflow]:
+            del self.conversations[conversation_id]
+            self.evicted += 1
+
+    def sweep(self) -> int:
+        '''
+        @desc     : 淘汰空闲超时的会话
+        @return   : int: 本次淘汰数
+        '''
+        deadline = time.monotonic() - settings.CHAT_IDLE_TIMEOUT
+        idle = [c.id for c in self.conversations.values() if not c.busy and c.last_active < deadline]
+        for conversation_id in idle:
+            del self.conversations[conversation_id]
+        self.evicted += len(idle)
+        return len(idle)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(settings.CHAT_SWEEP_INTERVAL)
+            evicted = self.sweep()
+            if evicted:
+                logger.info(f"evicted {evicted} idle conversations, {len(self.conversations)} active")
+
+    def stats(self) -> dict:
+        return {
+            "conversations": len(self.conversations),
+            "results": len(self.results),
+            "busy": sum(1 for c in self.conversations.values() if c.busy),
+            "created": self.created,
+            "evicted": self.evicted,
+        }
+
+
+def build_app(service: ChatService) -> Starlette:
+    """
+    @desc     : 组装 HTTP / WebSocket 路由
+    """
+
+    async def create_conversation(request: Request) -> JSONResponse:
+        return JSONResponse({"conversation_id": service.create().id}, status_code=201)
+
+    async def get_conversation(request: Request) -> JSONResponse:
+        conversation = service.get(request.path_params["conversation_id"])
+        if conversation is None:
+            return JSONResponse({"error": "conversation not found"}, status_code=404)
+        return JSONResponse({
+            "conversation_id": conversation.id,
+            "turns": conversation.turns,
+            "messages": len(conversation.engine.messages),
+            "fast_path": conversation.engine.fast_path.stats(),
+        })
+
+    async def delete_conversation(request: Request) -> Response:
+        found = service.close(request.path_params["conversation_id"])
+        return Response(status_code=204 if found else 404)
+
+    async def post_message(request: Request) -> Response:
+        conversation = service.get(request.path_params["conversation_id"])
+        if conversation is None:
+            return JSONResponse({"error": "conversation not found"}, status_code=404)
+        try:
+            query = str((await request.json())["content"]).strip()
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse({"error": "body must be {\"content\": \"...\"}"}, status_code=400)
+        if not query:
+            return JSONResponse({"error": "empty content"}, status_code=400)
+
+        async def events():
+            started = time.perf_counter()
+            ttft = None
+            try:
+                async for token in conversation.ask(query):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+                done = {"done": True, "ttft": ttft, "latency": time.perf_counter() - started}
+                yield f"data: {json.dumps(done)}\n\n"
+            except Exception as e:
+                logger.exception(f"conversation {conversation.id} failed")
+                yield f"data: {json.dumps({'error': f'{type(e).__name__}: {e}'}, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def websocket_chat(websocket: WebSocket):
+        conversation = service.get(websocket.path_params["conversation_id"])
+        if conversation is None:
+            await websocket.close(code=4404)
+            return
+        await websocket.accept()
+        try:
+            while True:
+                query = (await websocket.receive_text()).strip()
+                if not query:
+                    continue
+                try:
+                    async for token in conversation.ask(query):
+                        await websocket.send_json({"type": "token", "content": token})
+                    await websocket.send_json({"type": "done"})
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    logger.exception(f"conversation {conversation.id} failed")
+                    await websocket.send_json({"type": "error", "content": f"{type(e).__name__}: {e}"})
+        except WebSocketDisconnect:
+            pass
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse(service.stats())
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        await service.start()
+        try:
+            yield
+        finally:
+            await service.stop()
+
+    return Starlette(
+        routes=[
+            Route("/conversations", create_conversation, methods=["POST"]),
+            Route("/conversations/{conversation_id}", get_conversation, methods=["GET"]),
+            Route("/conversations/{conversation_id}", delete_conversation, methods=["DELETE"]),
+            Route("/conversations/{conversation_id}/messages", post_message, methods=["POST"]),
+            WebSocketRoute("/conversations/{conversation_id}/ws", websocket_chat),
+            Route("/stats", stats, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
+    app = build_app(ChatService.from_settings())
+    uvicorn.run(app, host=settings.CHAT_HOST, port=settings.CHAT_PORT, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@File    :   fast_path.py
+@Time    :   2025/10/06 20:18:35
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   纯函数工具的客户端快速路径：本地执行或按规范化参数命中结果表，未命中再走 MCP
+"""
+
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pydantic_core
+from mcp import types
+
+logger = logging.getLogger(__name__)
+
+
+def _divide(a: float, b: float) -> float:
+    # 与服务端 divide 一致：除数为 0 时返回 inf
+    return float("inf") if b == 0 else a / b
+
+
+# 可在客户端直接计算的标量工具，语义与 tools/math_tool.py 保持一致
+LOCAL_TOOLS: Dict[str, Callable[..., Any]] = {
+    "add": lambda a, b: a + b,
+    "subtract": lambda a, b: a - b,
+    "multiply": lambda a, b: a * b,
+    "divide": _divide,
+}
+
+
+def is_pure(tool: Optional[types.Tool]) -> bool:
+    '''
+    @desc     : 服务端声明为只读、幂等且不访问外部服务（openWorldHint 为 False）的工具才走快速路径；
+                openWorldHint 缺省视为 True，如搜索结果随时间变化，不能复用
+    '''
+    hints = tool.annotations if tool else None
+    return bool(hints and hints.readOnlyHint and hints.idempotentHint and hints.openWorldHint is False)
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        # 1 与 1.0 在服务端校验后等价
+        return int(value)
+    return value
+
+
+def canonical_args(name: str, args: dict) -> str:
+    '''
+    @desc     : 结果表的键：工具名 + 键排序、数值归一后的紧凑 JSON
+    '''
+    return name + ":" + json.dumps(_normalize(args), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _text_result(value: Any) -> types.CallToolResult:
+    # 与 FastMCP 对返回值的文本序列化方式相同
+    text = pydantic_core.to_json(value, fallback=str, indent=2).decode()
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=text)],
+        structuredContent={"result": value},
+        isError=False,
+    )
+
+
+class ResultTable:
+    '''
+    @name     : ResultTable
+    @desc     : 纯函数工具结果的 LRU 表，可在多个会话间共享，条目 ttl 秒后过期（服务端升级后不会一直返回旧结果）；
+                同时记录各工具远程调用的平均耗时，用于估算节省
+    '''
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, types.CallToolResult]]" = OrderedDict()
+        self._remote_latency: Dict[str, float] = {}
+
+    def get(self, key: str) -> Optional[types.CallToolResult]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return result
+
+    def put(self, key: str, result: types.CallToolResult):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, result)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def observe(self, name: str, seconds: float):
+        previous = self._remote_latency.get(name)
+        self._remote_latency[name] = seconds if previous is None else previous * 0.8 + seconds * 0.2
+
+    def remote_latency(self, name: str) -> float:
+        '''
+        @desc     : 该工具远程调用的平均耗时；本地执行的工具从未走远程时，用其他纯函数工具的均值估算
+        '''
+        if name in self._remote_latency:
+            return self._remote_latency[name]
+        if self._remote_latency:
+            return sum(self._remote_latency.values()) / len(self._remote_latency)
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class FastPath:
+    '''
+    @name     : FastPath
+    @desc     : 包装 MCPClient.call_tool。纯函数工具优先本地执行，其次查结果表，最后回退到服务端并写回结果表；
+                非纯函数工具直接透传。统计按会话记录。
+    '''
+
+    def __init__(self, mcp_client, table: ResultTable, enabled: bool = True):
+        self.mcp_client = mcp_client
+        self.table = table
+        self.enabled = enabled
+        self.local = 0
+        self.memo_hits = 0
+        self.remote = 0
+        self.saved_seconds = 0.0
+
+    def _local(self, name: str, args: dict) -> Optional[types.CallToolResult]:
+        fn = LOCAL_TOOLS.get(name)
+        if fn is None:
+            return None
+        try:
+            value = fn(**{k: float(v) for k, v in args.items()})
+        except (TypeError, ValueError):
+            # 参数不符合预期时交给服务端校验并返回错误
+            return None
+        # inf / nan 无法按输出 schema 序列化，保持与服务端一致的行为
+        return _text_result(value) if math.isfinite(value) else None
+
+    async def call_tool(self, name: str, args: dict) -> types.CallToolResult:
+        if not self.enabled or not is_pure(await self.mcp_client.get_tool(name)):
+            return await self.mcp_client.call_tool(name, args)
+
+        result = self._local(name, args)
+        if result is not None:
+            self.local += 1
+            self.saved_seconds += self.table.remote_latency(name)
+            return result
+
+        key = canonical_args(name, args)
+        result = self.table.get(key)
+        if result is not None:
+            self.memo_hits += 1
+            self.saved_seconds += self.table.remote_latency(name)
+            return result
+
+        started = time.perf_counter()
+        result = await self.mcp_client.call_tool(name, args)
+        self.remote += 1
+        self.table.observe(name, time.perf_counter() - started)
+        if not result.isError:
+            self.table.put(key, result)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "local": self.local,
+            "memo_hits": self.memo_hits,
+            "remote": self.remote,
+            "saved_ms": round(self.saved_seconds * 1000, 1),
+        }
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+"""
+@File    :   history.py
+@Time    :   2025/09/24 20:17:45
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   按 token 预算管理对话历史
+"""
+
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    @desc     : 粗略估算 token 数：CJK 等非 ASCII 字符按 1 个，ASCII 按 4 个字符 1 个
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def message_tokens(msg: dict) -> int:
+    tokens = 4 + estimate_tokens(msg.get("content") or "")
+    for call in msg.get("tool_calls") or []:
+        fn = call.get("function", {})
+        tokens += estimate_tokens(fn.get("name", "")) + estimate_tokens(fn.get("arguments", ""))
+    return tokens
+
+
+class ConversationHistory:
+    """
+    @name     : ConversationHistory
+    @desc     : 可直接替代 ChatEngine.messages 的列表，追加时增量计数 token，超出预算时原地压缩：
+                1. 先截断较早轮次的 tool 结果；
+                2. 仍超出则从最早的用户轮次开始整轮丢弃。
+                最近 keep_turns 个用户轮次固定保留，带 tool_calls 的 assistant 消息与其 tool 回复
+                作为一个整体处理，不会被拆开。system prompt 由 LLMHandler 单独拼接，不在此列表中。
+    """
+
+    def __init__(self, budget: int, keep_turns: int = 2, tool_snippet: int = 300):
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.tool_snippet = tool_snippet
+        self._messages: List[dict] = []
+        self._tokens: List[int] = []
+        self.total_tokens = 0
+
+    # ---------- list 接口 ----------
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def append(self, msg: dict):
+        self._messages.append(msg)
+        self._tokens.append(message_tokens(msg))
+        self.total_tokens += self._tokens[-1]
+        if self.total_tokens > self.budget:
+            self.compact()
+
+    def extend(self, msgs):
+        for msg in msgs:
+            self.append(msg)
+
+    def rollback(self, msg: dict):
+        """
+        @desc     : 删除 msg 及其之后的所有消息，用于撤销未完成的轮次；
+                    按对象查找而不是按下标，期间发生的压缩不影响定位
+        """
+        for i in range(len(self._messages) - 1, -1, -1):
+            if self._messages[i] is msg:
+                self.total_tokens -= sum(self._tokens[i:])
+                del self._messages[i:]
+                del self._tokens[i:]
+                return
+
+    # ---------- 压缩 ----------
+
+    def _pinned_start(self) -> int:
+        """最近 keep_turns 个用户轮次的起始下标"""
+        seen = 0
+        for i in range(len(self._messages) - 1, -1, -1):
+            if self._messages[i].get("role") == "user":
+                seen += 1
+                if seen >= self.keep_turns:
+                    return i
+        return 0
+
+    def _set(self, i: int, msg: dict):
+        self.total_tokens -= self._tokens[i]
+        self._messages[i] = msg
+        self._tokens[i] = message_tokens(msg)
+        self.total_tokens += self._tokens[i]
+
+    def _first_turn_end(self) -> int:
+        """最早一个完整轮次（到下一条 user 消息为止）的结束下标，tool_calls 与其 tool 回复必在同一轮"""
+        end = 1
+        while end < len(self._messages) and self._messages[end].get("role") != "user":
+            end += 1
+        return end
+
+    def compact(self):
+        pinned = self._pinned_start()
+        before = self.total_tokens
+
+        for i in range(pinned):
+            if self.total_tokens <= self.budget:
+                break
+            msg = self._messages[i]
+            content = msg.get("content") or ""
+            if msg.get("role") == "tool" and len(content) > self.tool_snippet:
+                omitted = len(content) - self.tool_snippet
+                self._set(i, {**msg, "content": f"{content[:self.tool_snippet]}...[truncated {omitted} chars]"})
+
+        while self.total_tokens > self.budget and pinned > 0:
+            end = min(self._first_turn_end(), pinned)
+            self.total_tokens -= sum(self._tokens[:end])
+            del self._messages[:end]
+            del self._tokens[:end]
+            pinned -= end
+
+        if self.total_tokens != before:
+            logger.info(f"history compacted: {before} -> {self.total_tokens} tokens, {len(self)} messages")
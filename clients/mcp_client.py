@@ -8,14 +8,24 @@
 @Desc    :   MCP + LLM 集成，支持工具调用
 """
 import json
+import re
+import time
 import asyncio
-from typing import Optional
-from contextlib import AsyncExitStack
+from collections import deque
+from types import SimpleNamespace
+from typing import AsyncIterator, Optional
+from contextlib import AsyncExitStack, asynccontextmanager
 import logging
 
-from openai import OpenAI
-from mcp import ClientSession, StdioServerParameters
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from fast_path import FastPath, ResultTable
+from history import ConversationHistory
 from setting import settings
 
 logger = logging.getLogger(__name__)
@@ -30,25 +40,74 @@ class MCPClient:
     def __init__(self):
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
+        # 工具目录缓存，仅在服务端通知 tools/list_changed 或重新连接时失效
+        self._tools: Optional[types.ListToolsResult] = None
+        self._tools_by_name: dict[str, types.Tool] = {}
+        self._openai_tools: Optional[list] = None
 
-    async def connect(self, command: str = "uv", args: Optional[list] = None):
+    async def connect(self, command: str = "uv", args: Optional[list] = None, env: Optional[dict] = None):
         """
         @desc     : 连接到 MCP 服务器
         @param    : command (str): 服务器命令
                     args (list): 命令参数
+                    env (dict): 额外的环境变量
         """
         if args is None:
             args = ["run", "main.py"]
 
-        server_params = StdioServerParameters(command=command, args=args, env=None)
+        server_params = StdioServerParameters(command=command, args=args, env=env)
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
         stdio, write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(stdio, write))
+        self.session = await self.exit_stack.enter_async_context(
+            ClientSession(stdio, write, message_handler=self._handle_message)
+        )
         await self.session.initialize()
+        self.invalidate_tools()
+
+    async def _handle_message(self, message):
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            logger.info("Tool list changed, invalidating cache")
+            self.invalidate_tools()
+
+    def invalidate_tools(self):
+        self._tools = None
+        self._tools_by_name = {}
+        self._openai_tools = None
 
-    async def list_tools(self):
+    async def _fetch_tools(self) -> types.ListToolsResult:
         return await self.session.list_tools()
 
+    async def list_tools(self) -> types.ListToolsResult:
+        if self._tools is None:
+            self._tools = await self._fetch_tools()
+            self._tools_by_name = {t.name: t for t in self._tools.tools}
+        return self._tools
+
+    async def get_tool(self, name: str) -> Optional[types.Tool]:
+        await self.list_tools()
+        return self._tools_by_name.get(name)
+
+    async def openai_tools(self) -> list:
+        """
+        @desc     : 转换为 OpenAI function calling 格式的工具列表（缓存）
+        """
+        if self._openai_tools is None:
+            tools = (await self.list_tools()).tools
+            self._openai_tools = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": t.name,
+                        "description": t.description,
+                        "parameters": t.inputSchema,
+                    },
+                }
+                for t in tools
+            ]
+        return self._openai_tools
+
     async def call_tool(self, tool_name: str, tool_args: dict):
         logger.info(f"Calling tool {tool_name} with args {tool_args}")
         return await self.session.call_tool(tool_name, tool_args)
@@ -57,6 +116,238 @@ class MCPClient:
         await self.exit_stack.aclose()
 
 
+@asynccontextmanager
+async def open_transport(target):
+    """
+    @desc     : 按目标类型打开传输层
+    @param    : target: StdioServerParameters，或以 /sse 结尾的 SSE 地址，或 streamable-http 地址
+    @return   : (read_stream, write_stream)
+    """
+    if isinstance(target, StdioServerParameters):
+        async with stdio_client(target) as (read, write):
+            yield read, write
+    elif target.rstrip("/").endswith("/sse"):
+        async with sse_client(target) as (read, write):
+            yield read, write
+    else:
+        async with streamablehttp_client(target) as (read, write, _):
+            yield read, write
+
+
+class PooledSession:
+    """
+    @name     : PooledSession
+    @desc     : 连接池中的单个会话。传输层与会话在专属 task 中打开和关闭
+                （anyio 要求 cancel scope 在同一 task 内进出），stop() 通知该 task 退出。
+    """
+
+    def __init__(self, target, message_handler=None):
+        self.target = target
+        self.message_handler = message_handler
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.healthy = False
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, timeout: float):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        if not self.healthy:
+            # _run 已结束，取出异常
+            await self._task
+
+    async def _run(self):
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(open_transport(self.target))
+                self.session = await stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self.message_handler)
+                )
+                await self.session.initialize()
+                self.healthy = True
+                self._ready.set()
+                await self._stop.wait()
+        finally:
+            self.healthy = False
+            self._ready.set()
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.healthy:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            logger.warning(f"Session {self.target} failed health check", exc_info=True)
+            return False
+
+    async def stop(self, timeout: float = 5.0):
+        self.healthy = False
+        self._stop.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except Exception:
+            logger.debug(f"Session {self.target} closed with error", exc_info=True)
+
+
+class MCPClientPool(MCPClient):
+    """
+    @name     : MCPClientPool
+    @desc     : 维护 N 个 MCP 会话（stdio 子进程或 SSE/HTTP 地址），按最少在途请求路由，
+                定期 ping 检查并替换失效会话，对外提供与 MCPClient 相同的接口。
+    """
+
+    def __init__(self, targets: list, health_interval: float = 15.0, health_timeout: float = 5.0):
+        super().__init__()
+        self.targets = targets
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.members: list[PooledSession] = []
+        self._health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls, command: str = "uv", args: Optional[list] = None):
+        """
+        @desc     : MCP_URL 可配置逗号分隔的多个地址，为空时启动 MCP_POOL_SIZE 个 stdio 子进程
+        """
+        urls = [u.strip() for u in settings.MCP_URL.split(",") if u.strip()]
+        if urls:
+            size = max(settings.MCP_POOL_SIZE, len(urls))
+            targets = [urls[i % len(urls)] for i in range(size)]
+        else:
+            params = StdioServerParameters(command=command, args=args or ["run", "main.py"], env=None)
+            targets = [params] * max(settings.MCP_POOL_SIZE, 1)
+        return cls(targets, settings.MCP_HEALTH_INTERVAL, settings.MCP_HEALTH_TIMEOUT)
+
+    async def _start_member(self, target) -> PooledSession:
+        member = PooledSession(target, message_handler=self._handle_message)
+        await member.start(timeout=self.health_timeout * 6)
+        return member
+
+    async def connect(self):
+        members = await asyncio.gather(*(self._start_member(t) for t in self.targets), return_exceptions=True)
+        for target, member in zip(self.targets, members):
+            if isinstance(member, BaseException):
+                logger.error(f"Failed to connect {target}: {member}")
+                member = PooledSession(target, message_handler=self._handle_message)
+            self.members.append(member)
+        if not any(m.healthy for m in self.members):
+            raise ConnectionError("No MCP session could be established")
+        self.invalidate_tools()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for i, member in enumerate(list(self.members)):
+                # 有在途请求的会话视为存活，跳过 ping
+                if member.healthy and (member.in_flight > 0 or await member.ping(self.health_timeout)):
+                    continue
+                logger.info(f"Replacing dead session {member.target}")
+                await member.stop()
+                try:
+                    self.members[i] = await self._start_member(member.target)
+                    self.invalidate_tools()
+                except Exception as e:
+                    logger.error(f"Failed to replace session {member.target}: {e}")
+
+    def _pick(self) -> PooledSession:
+        healthy = [m for m in self.members if m.healthy]
+        if not healthy:
+            raise ConnectionError("No healthy MCP session available")
+        return min(healthy, key=lambda m: m.in_flight)
+
+    async def _fetch_tools(self) -> types.ListToolsResult:
+        return await self._pick().session.list_tools()
+
+    async def call_tool(self, tool_name: str, tool_args: dict):
+        member = self._pick()
+        logger.info(f"Calling tool {tool_name} with args {tool_args} on {member.target}")
+        member.in_flight += 1
+        try:
+            return await member.session.call_tool(tool_name, tool_args)
+        except Exception:
+            # 传输层错误时 ping 失败，下一轮健康检查会替换该会话
+            if not await member.ping(self.health_timeout):
+                member.healthy = False
+            raise
+        finally:
+            member.in_flight -= 1
+
+    def stats(self) -> list[dict]:
+        return [{"target": str(m.target), "healthy": m.healthy, "in_flight": m.in_flight} for m in self.members]
+
+    async def cleanup(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        await asyncio.gather(*(m.stop() for m in self.members))
+
+
+class StreamedTurn:
+    """
+    @name     : StreamedTurn
+    @desc     : 一次流式补全。async for 逐个产出内容 token，同时增量拼装 tool_calls；
+                迭代结束后 finish_reason / message 与非流式 choice 用法一致，并记录首 token 时延与总时延。
+    """
+
+    def __init__(self, stream, started: float):
+        self._stream = stream
+        self.started = started
+        self.ttft: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.finish_reason: Optional[str] = None
+        self.content_parts: list[str] = []
+        self._calls: dict[int, dict] = {}
+        self.message = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for chunk in self._stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if self.ttft is None and (delta.content or delta.tool_calls):
+                self.ttft = time.perf_counter() - self.started
+            for tc in delta.tool_calls or []:
+                call = self._calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                if tc.id:
+                    call["id"] = tc.id
+                if tc.function and tc.function.name:
+                    call["name"] += tc.function.name
+                if tc.function and tc.function.arguments:
+                    call["arguments"] += tc.function.arguments
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+            if delta.content:
+                self.content_parts.append(delta.content)
+                yield delta.content
+        self.latency = time.perf_counter() - self.started
+        self.message = self._build_message()
+        logger.info(f"LLM turn finished: ttft={self.ttft or 0:.3f}s total={self.latency:.3f}s")
+
+    async def consume(self) -> "StreamedTurn":
+        async for _ in self:
+            pass
+        return self
+
+    def _build_message(self):
+        tool_calls = [
+            ChatCompletionMessageToolCall(
+                id=c["id"], type="function", function=Function(name=c["name"], arguments=c["arguments"] or "{}")
+            )
+            for _, c in sorted(self._calls.items())
+        ]
+        # 部分兼容接口在有 tool_calls 时 finish_reason 仍返回 stop
+        if tool_calls and self.finish_reason != "tool_calls":
+            self.finish_reason = "tool_calls"
+        content = "".join(self.content_parts) or None
+        return SimpleNamespace(content=content, tool_calls=tool_calls or None)
+
+
 class LLMHandler:
     """
     @name     : LLMHandler
@@ -64,9 +355,11 @@ class LLMHandler:
     """
 
     def __init__(self, api_key: str, base_url: str, model: str):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.model = model
         self.system_prompt = "You are a helpful assistant."
+        # 多会话共享同一个 LLMHandler 时只保留最近的耗时记录
+        self.timings: deque = deque(maxlen=settings.LLM_TIMINGS_SIZE)
 
     def build_messages(self, user_query: str, context=None):
         messages = [{"role": "system", "content": self.system_prompt}]
@@ -74,14 +367,39 @@ class LLMHandler:
             messages.extend(context)
         return messages
 
-    async def ask(self, query: str, available_tools: list, context=None):
+    async def ask(self, query: str, available_tools: list, context=None) -> StreamedTurn:
+        """
+        @desc     : 发起流式补全，返回的 StreamedTurn 需由调用方迭代或 consume()
+        """
         messages = self.build_messages(query, context)
-        response = self.client.chat.completions.create(
+        started = time.perf_counter()
+        stream = await self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             tools=available_tools,
+            stream=True,
         )
-        return response.choices[0]
+        return StreamedTurn(stream, started)
+
+    def record(self, turn: StreamedTurn):
+        self.timings.append({"ttft": turn.ttft, "latency": turn.latency})
+
+
+# 服务端准入控制拒绝时的错误文本（common/admission.py 的 Overloaded），工具并未执行，可按提示等待后重试
+_SERVER_BUSY = re.compile(r"server busy: .*retry after ([0-9.]+)s")
+
+
+def busy_retry_after(result: types.CallToolResult) -> Optional[float]:
+    '''
+    @desc     : 工具调用被服务端准入控制拒绝时返回建议的等待秒数，否则返回 None
+    '''
+    if not result.isError:
+        return None
+    for content in result.content:
+        match = _SERVER_BUSY.search(getattr(content, "text", ""))
+        if match:
+            return float(match.group(1))
+    return None
 
 
 class ChatEngine:
@@ -90,25 +408,33 @@ class ChatEngine:
     @desc     : 将 MCPClient 与 LLMHandler 组合，处理完整问答流程
     """
 
-    def __init__(self, mcp_client: MCPClient, llm_handler: LLMHandler):
+    def __init__(self, mcp_client: MCPClient, llm_handler: LLMHandler, results: Optional[ResultTable] = None):
         self.mcp_client = mcp_client
         self.llm_handler = llm_handler
-        self.messages = []
+        self.messages = ConversationHistory(
+            budget=settings.HISTORY_TOKEN_BUDGET,
+            keep_turns=settings.HISTORY_KEEP_TURNS,
+            tool_snippet=settings.HISTORY_TOOL_SNIPPET,
+        )
+        # 纯函数工具的结果表可由多个会话共享，节省统计按会话记录
+        self.fast_path = FastPath(
+            mcp_client,
+            results if results is not None else ResultTable(settings.FAST_PATH_MEMO_SIZE, settings.FAST_PATH_MEMO_TTL),
+            enabled=settings.FAST_PATH,
+        )
 
     async def process_query(self, query: str) -> str:
-        # 获取工具列表
-        tools_response = await self.mcp_client.list_tools()
-        available_tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": t.name,
-                    "description": t.description,
-                    "parameters": t.inputSchema,
-                },
-            }
-            for t in tools_response.tools
-        ]
+        parts = []
+        async for token in self.stream_query(query):
+            parts.append(token)
+        return "".join(parts)
+
+    async def stream_query(self, query: str) -> AsyncIterator[str]:
+        """
+        @desc     : 处理一次提问，最终回答的内容 token 边生成边产出
+        """
+        # 获取工具列表（MCPClient 内缓存）
+        available_tools = await self.mcp_client.openai_tools()
 
         self.llm_handler.system_prompt = """
             You are a helpful assistant that can use tools.
@@ -123,32 +449,69 @@ class ChatEngine:
         """
 
         content = await self.llm_handler.ask(query, available_tools, context=self.messages)
+        async for token in content:
+            yield token
+        self.llm_handler.record(content)
 
         while content.finish_reason == "tool_calls":
-            tool_call = content.message.tool_calls[0]
-            tool_name = tool_call.function.name
-            tool_args = json.loads(tool_call.function.arguments)
+            tool_calls = content.message.tool_calls
 
+            # 同一轮的所有工具调用并发执行，结果按原顺序追加；
+            # 带 tool_calls 的 assistant 消息与其 tool 结果一起写入历史，中途取消不会留下没有结果的 tool_calls
+            semaphore = asyncio.Semaphore(max(1, settings.TOOL_CONCURRENCY))
+            results = await asyncio.gather(*(self.run_tool_call(call, semaphore) for call in tool_calls))
             self.messages.append(
                 {
                     "role": "assistant",
-                    "content": None,
-                    "tool_calls": [call.model_dump() for call in content.message.tool_calls],
+                    "content": content.message.content,
+                    "tool_calls": [call.model_dump() for call in tool_calls],
                 }
             )
+            self.messages.extend(results)
 
-            result = await self.mcp_client.call_tool(tool_name, tool_args)
-
-            self.messages.append(
-                {
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": "\n".join(c.text for c in result.content if hasattr(c, "text")),
-                }
-            )
             content = await self.llm_handler.ask(query, available_tools, context=self.messages)
+            async for token in content:
+                yield token
+            self.llm_handler.record(content)
         self.messages.append({"role": "assistant", "content": content.message.content})
-        return content.message.content
+
+    async def run_tool_call(self, tool_call, semaphore: asyncio.Semaphore) -> dict:
+        """
+        @desc     : 执行单个工具调用，失败或超时只影响自身的 tool 消息
+        @param    : tool_call: LLM 返回的 tool_call
+                    semaphore (asyncio.Semaphore): 并发上限
+        @return   : dict: role 为 tool 的消息
+        """
+        tool_name = tool_call.function.name
+        async with semaphore:
+            try:
+                tool_args = json.loads(tool_call.function.arguments or "{}")
+                result = await asyncio.wait_for(
+                    self._call_tool(tool_name, tool_args), timeout=settings.TOOL_TIMEOUT
+                )
+                text = "\n".join(c.text for c in result.content if hasattr(c, "text"))
+            except asyncio.TimeoutError:
+                logger.warning(f"Tool {tool_name} timed out after {settings.TOOL_TIMEOUT}s")
+                text = f"ERROR: tool {tool_name} timed out"
+            except Exception as e:
+                logger.exception(f"Tool {tool_name} failed")
+                text = f"ERROR: {type(e).__name__}: {e}"
+        return {"role": "tool", "tool_call_id": tool_call.id, "content": text}
+
+    async def _call_tool(self, tool_name: str, tool_args: dict) -> types.CallToolResult:
+        """
+        @desc     : 调用工具；被服务端准入控制拒绝时按 retry after 提示等待后重试，
+                    剩余时间不够再等一次时才把拒绝结果交给 LLM
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.TOOL_TIMEOUT
+        while True:
+            result = await self.fast_path.call_tool(tool_name, tool_args)
+            delay = busy_retry_after(result)
+            if delay is None or loop.time() + delay >= deadline:
+                return result
+            logger.info(f"Tool {tool_name} rejected by server admission control, retry in {delay:.1f}s")
+            await asyncio.sleep(delay)
 
     def print_history(self, messages):
         """
@@ -189,7 +552,13 @@ class ChatEngine:
             try:
                 print(f"[助手调用工具完成任务'{query}'中...]")
                 self.messages.append({"role": "user", "content": query})
-                response = await self.process_query(query)
+                async for token in self.stream_query(query):
+                    print(token, end="", flush=True)
+                timing = self.llm_handler.timings[-1]
+                print(f"\n[首 token {timing['ttft'] or 0:.2f}s, 总耗时 {timing['latency']:.2f}s]")
+                saved = self.fast_path.stats()
+                if saved["local"] or saved["memo_hits"]:
+                    print(f"[本地执行 {saved['local']} 次，复用结果 {saved['memo_hits']} 次，约节省 {saved['saved_ms']:.0f}ms]")
 
             except Exception as e:
                 logger.exception("Error processing query")
@@ -199,7 +568,8 @@ async def main():
     """
     @description : 初始化 MCPClient、LLMHandler 和 ChatEngine
     """
-    mcp_client = MCPClient()
+    pooled = settings.MCP_URL or settings.MCP_POOL_SIZE > 1
+    mcp_client = MCPClientPool.from_settings() if pooled else MCPClient()
     llm_handler = LLMHandler(
         api_key=settings.LLM_API_KEY,
         base_url=settings.LLM_BASE_URL,
@@ -24,7 +24,27 @@ class Settings(BaseSettings):
     LLM_BASE_URL: str = Field("", description="")
     LLM_MODEL: str = Field("", description="")
 
-    MCP_URL: str = Field("", description="")
+    MCP_URL: str = Field("", description="MCP 服务地址，多个用逗号分隔；以 /sse 结尾走 SSE，否则走 streamable-http")
+    MCP_POOL_SIZE: int = Field(1, description="MCPClientPool 会话数，大于 1 时启用连接池")
+    MCP_HEALTH_INTERVAL: float = Field(15.0, description="会话健康检查间隔（秒）")
+    MCP_HEALTH_TIMEOUT: float = Field(5.0, description="健康检查 ping 超时（秒）")
+
+    TOOL_CONCURRENCY: int = Field(4, description="同一轮 tool_calls 的最大并发数")
+    TOOL_TIMEOUT: float = Field(120.0, description="单个工具调用超时（秒）")
+    FAST_PATH: bool = Field(True, description="服务端标记为只读、幂等且不访问外部服务的工具是否在客户端本地执行或复用结果")
+    FAST_PATH_MEMO_SIZE: int = Field(4096, description="纯函数工具结果表的最大条目数")
+    FAST_PATH_MEMO_TTL: float = Field(600.0, description="纯函数工具结果表条目的有效期（秒），0 表示不复用结果")
+
+    HISTORY_TOKEN_BUDGET: int = Field(8000, description="对话历史的 token 预算")
+    HISTORY_KEEP_TURNS: int = Field(2, description="始终完整保留的最近用户轮次数")
+    HISTORY_TOOL_SNIPPET: int = Field(300, description="压缩时较早 tool 结果保留的字符数")
+
+    CHAT_HOST: str = Field("0.0.0.0", description="聊天服务监听地址")
+    CHAT_PORT: int = Field(8000, description="聊天服务监听端口")
+    CHAT_MAX_CONVERSATIONS: int = Field(10000, description="进程内最多保留的会话数，超出时淘汰最久未用的空闲会话")
+    CHAT_IDLE_TIMEOUT: float = Field(1800.0, description="会话空闲多久后被淘汰（秒）")
+    CHAT_SWEEP_INTERVAL: float = Field(60.0, description="空闲会话清理间隔（秒）")
+    LLM_TIMINGS_SIZE: int = Field(1000, description="LLMHandler 保留的最近调用耗时条数")
 
 
 settings = Settings(
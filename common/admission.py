@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   admission.py
+@Time    :   2025/10/09 16:27:41
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   入站准入控制：按优先级分道，每道有全局与单客户端在途上限、有界等待队列与截止时间，满载时快速拒绝
+'''
+
+import asyncio
+import functools
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from mcp.server.lowlevel.server import request_ctx
+from mcp.types import ToolAnnotations
+
+from setting import settings
+
+
+class Overloaded(Exception):
+    """请求未被执行，客户端可在 retry_after 秒后重试"""
+
+    def __init__(self, lane: str, reason: str, retry_after: float):
+        super().__init__(f"server busy: {lane} {reason}, retry after {retry_after:.1f}s")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def client_key() -> Optional[Tuple[str, bool]]:
+    '''
+    @desc     : 当前工具调用所属的客户端及其是否受信任。ADMISSION_CLIENT_KEY 为 session 时，
+                sse 取 session_id，streamable-http 取 mcp-session-id，都没有时取来源 IP；为 ip 时一律取来源 IP。
+                来源 IP 在 ADMISSION_TRUSTED_CLIENTS 中的客户端（如经单个 MCP 会话多路复用的聊天服务）不受单客户端上限约束
+    @return   : Tuple[str, bool] | None: (客户端键, 是否受信任)；stdio 没有 HTTP 请求，返回 None
+    '''
+    try:
+        request = request_ctx.get().request
+    except LookupError:
+        return None
+    if request is None:
+        return None
+    host = request.client.host if request.client else "unknown"
+    trusted = host in settings.ADMISSION_TRUSTED_CLIENTS
+    if settings.ADMISSION_CLIENT_KEY == "ip":
+        return host, trusted
+    return request.query_params.get("session_id") or request.headers.get("mcp-session-id") or host, trusted
+
+
+def lane_of(name: str, annotations: Optional[ToolAnnotations]) -> str:
+    '''
+    @desc     : 纯函数工具（只读、幂等、不访问外部服务）归入 interactive，其余归入 standard；ADMISSION_TOOL_LANES 可逐个覆盖
+    '''
+    if name in settings.ADMISSION_TOOL_LANES:
+        return settings.ADMISSION_TOOL_LANES[name]
+    cheap = annotations and annotations.readOnlyHint and annotations.idempotentHint and annotations.openWorldHint is False
+    return "interactive" if cheap else "standard"
+
+
+class _Lane:
+    '''
+    @name     : _Lane
+    @desc     : 一个优先级分道。等待者按 FIFO 排队，但已达单客户端上限的等待者会被跳过，不阻塞其他客户端；
+                受信任的客户端只受分道全局上限约束
+    '''
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, client_max_in_flight: int, timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.client_max_in_flight = client_max_in_flight
+        self.timeout = timeout
+        self.in_flight = 0
+        self.clients: Dict[str, int] = {}
+        self.waiters: Deque[Tuple[str, bool, asyncio.Future]] = deque()
+        self.queued: Dict[str, int] = {}
+        # 单次执行耗时的指数滑动平均，用于估算 retry_after
+        self.service_time = 1.0
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def _can_admit(self, client: str, trusted: bool) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            return False
+        return trusted or self.clients.get(client, 0) < self.client_max_in_flight
+
+    def _admit(self, client: str):
+        self.in_flight += 1
+        self.clients[client] = self.clients.get(client, 0) + 1
+        self.admitted += 1
+
+    def retry_after(self) -> float:
+        '''
+        @desc     : 排在队尾的请求大约要等多久才能开始执行
+        '''
+        return max(0.1, self.service_time * (len(self.waiters) + 1) / max(self.max_in_flight, 1))
+
+    def _overloaded(self, reason: str, counter: str = "rejected") -> Overloaded:
+        setattr(self, counter, getattr(self, counter) + 1)
+        return Overloaded(self.name, reason, self.retry_after())
+
+    def _dequeue(self, client: str):
+        self.queued[client] -= 1
+        if not self.queued[client]:
+            del self.queued[client]
+
+    def drain(self):
+        if not self.waiters or self.in_flight >= self.max_in_flight:
+            return
+        remaining = deque()
+        while self.waiters:
+            client, trusted, waiter = self.waiters.popleft()
+            if waiter.done():
+                continue
+            if self._can_admit(client, trusted):
+                self._dequeue(client)
+                self._admit(client)
+                waiter.set_result(None)
+            else:
+                remaining.append((client, trusted, waiter))
+        self.waiters = remaining
+
+    async def acquire(self, client: str, trusted: bool = False):
+        if not self.waiters and self._can_admit(client, trusted):
+            self._admit(client)
+            return
+        if len(self.waiters) >= self.max_queue:
+            raise self._overloaded("queue full")
+        # 每个客户端最多再排队同样多的请求，避免单个客户端占满队列
+        if not trusted and self.queued.get(client, 0) >= self.client_max_in_flight:
+            raise self._overloaded("per-client limit reached")
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append((client, trusted, waiter))
+        self.queued[client] = self.queued.get(client, 0) + 1
+        # 队首可能只是被单客户端上限挡住，新来的请求可以直接放行
+        self.drain()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时与放行同时发生：归还已占用的名额
+                self.release(client, None)
+            else:
+                waiter.cancel()
+                self.waiters.remove((client, trusted, waiter))
+                self._dequeue(client)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._overloaded(f"queue deadline {self.timeout:g}s exceeded", "expired") from None
+            raise
+
+    def release(self, client: str, elapsed: Optional[float]):
+        self.in_flight -= 1
+        self.clients[client] -= 1
+        if not self.clients[client]:
+            del self.clients[client]
+        if elapsed is not None:
+            self.service_time = self.service_time * 0.8 + elapsed * 0.2
+        self.drain()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "clients": len(self.clients),
+            "service_time_ms": round(self.service_time * 1000, 1),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
+
+
+class AdmissionController:
+    '''
+    @name     : AdmissionController
+    @desc     : 工具分发前的准入控制。各分道独立排队，interactive 道的廉价工具不会排在生图等慢调用之后；
+                分道参数来自 ADMISSION_LANES
+    '''
+
+    def __init__(self):
+        self._lanes: Dict[str, _Lane] = {}
+
+    def lane(self, name: str) -> _Lane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            if name not in settings.ADMISSION_LANES:
+                raise ValueError(f"unknown admission lane {name!r}, expected one of {list(settings.ADMISSION_LANES)}")
+            conf = settings.ADMISSION_LANES[name]
+            lane = self._lanes[name] = _Lane(
+                name,
+                max_in_flight=int(conf["max_in_flight"]),
+                max_queue=int(conf["max_queue"]),
+                client_max_in_flight=int(conf["client_max_in_flight"]),
+                timeout=float(conf["timeout"]),
+            )
+        return lane
+
+    def wrap(self, fn: Callable, lane_name: str) -> Callable:
+        '''
+        @desc     : 返回先经准入再执行 fn 的协程函数；没有 HTTP 请求的调用（stdio）直接执行
+        @param    : fn (Callable): 协程函数
+                    lane_name (str): 分道名
+        @return   : Callable: 协程函数
+        '''
+        lane = self.lane(lane_name)
+
+        @functools.wraps(fn)
+        async def run(**kwargs):
+            key = client_key()
+            if key is None:
+                return await fn(**kwargs)
+            client, trusted = key
+            await lane.acquire(client, trusted)
+            started = time.perf_counter()
+            try:
+                return await fn(**kwargs)
+            finally:
+                lane.release(client, time.perf_counter() - started)
+
+        return run
+
+    def stats(self) -> dict:
+        return {name: lane.stats() for name, lane in self._lanes.items()}
+
+
+admission = AdmissionController()
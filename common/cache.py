@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   cache.py
+@Time    :   2025/09/21 09:48:17
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   进程内结果缓存
+'''
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class AsyncTTLCache:
+    '''
+    @name     : AsyncTTLCache
+    @desc     : 带 TTL 与 LRU 容量上限的异步缓存，同一 key 的并发请求合并为一次加载（single-flight）。
+                加载抛出异常时结果不会写入缓存，异常会传给所有等待者。
+    '''
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def lookup(self, key: Hashable, default: Any = None) -> Any:
+        '''
+        @desc     : 与 get 相同，命中时计入 hits；供在 get_or_load 之前先查缓存的调用方使用
+        '''
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        '''
+        @desc     : 命中直接返回，否则加载并缓存
+        @param    : key (Hashable): 缓存键
+                    loader (Callable): 无参协程工厂，仅在未命中且无进行中请求时调用
+        @return   : Any: 缓存值或加载结果
+        '''
+        _missing = object()
+        value = self.lookup(key, _missing)
+        if value is not _missing:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Task):
+                self._inflight.pop(key, None)
+                if not t.cancelled() and t.exception() is None:
+                    self.set(key, t.result())
+
+            task.add_done_callback(_done)
+        # shield: 单个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
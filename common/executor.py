@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   executor.py
+@Time    :   2025/10/08 10:52:19
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   工具执行策略：事件循环内执行（inline）、有界线程池（thread）或进程池（process），
+             每个工具各自的并发上限与超时
+'''
+
+import asyncio
+import functools
+import importlib
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from setting import settings
+
+MODES = ("inline", "thread", "process")
+
+
+@dataclass
+class ToolPolicy:
+    '''
+    @name     : ToolPolicy
+    @desc     : mode 为执行方式；concurrency 为该工具同时执行的上限（0 不限）；timeout 为排队加执行的总时限（秒，0 不限）
+    '''
+
+    mode: str = "inline"
+    concurrency: int = 0
+    timeout: float = 0.0
+
+
+def resolve_policy(name: str, is_async: bool) -> ToolPolicy:
+    '''
+    @desc     : 异步工具默认 inline，同步工具默认 TOOL_SYNC_MODE；TOOL_POLICIES 中同名条目逐项覆盖。
+                TOOL_MAX_CONCURRENCY / TOOL_EXEC_TIMEOUT 只作为 thread / process 模式的默认值，
+                inline 工具（如 I/O 密集的异步工具）默认不限，需要时在 TOOL_POLICIES 中显式配置
+    '''
+    overrides = settings.TOOL_POLICIES.get(name, {})
+    policy = ToolPolicy(mode=str(overrides.get("mode", "inline" if is_async else settings.TOOL_SYNC_MODE)))
+    if policy.mode in ("thread", "process"):
+        policy.concurrency = settings.TOOL_MAX_CONCURRENCY
+        policy.timeout = settings.TOOL_EXEC_TIMEOUT
+    for key, value in overrides.items():
+        setattr(policy, key, type(getattr(policy, key))(value))
+    if policy.mode not in MODES:
+        raise ValueError(f"tool {name}: unknown execution mode {policy.mode!r}, expected one of {MODES}")
+    return policy
+
+
+# ---------- 进程池 worker 侧 ----------
+
+_worker_tools: Dict[str, Callable] = {}
+_worker_modules: set = set()
+
+
+class _Collector:
+    '''
+    @name     : _Collector
+    @desc     : 在 worker 进程内代替 FastMCP 执行各模块的 register，只收集工具函数
+    '''
+
+    def tool(self, name: Optional[str] = None, *args, **kwargs):
+        def decorator(fn):
+            _worker_tools[name or fn.__name__] = fn
+            return fn
+        return decorator
+
+    def resource(self, *args, **kwargs):
+        return lambda fn: fn
+
+    def custom_route(self, *args, **kwargs):
+        return lambda fn: fn
+
+
+def _run_in_worker(module: str, name: str, kwargs: dict) -> Any:
+    if module not in _worker_modules:
+        importlib.import_module(module).register(_Collector())
+        _worker_modules.add(module)
+    return _worker_tools[name](**kwargs)
+
+
+# ---------- 主进程侧 ----------
+
+class ToolExecutor:
+    '''
+    @name     : ToolExecutor
+    @desc     : 按策略把工具函数包装为协程。线程池与进程池在首次使用时创建；
+                超时只让调用方提前返回，任务真正结束前仍占用并发名额，避免卡住的调用堆满线程池
+    '''
+
+    def __init__(self):
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self.policies: Dict[str, ToolPolicy] = {}
+        self.running: Dict[str, int] = {}
+        self.timeouts: Dict[str, int] = {}
+
+    def _pool(self, mode: str) -> Executor:
+        if mode == "thread":
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(settings.TOOL_THREAD_WORKERS, thread_name_prefix="tool")
+            return self._thread_pool
+        if self._process_pool is None:
+            # spawn：不继承主进程的事件循环与线程状态
+            self._process_pool = ProcessPoolExecutor(
+                settings.TOOL_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def wrap(self, name: str, fn: Callable, is_async: bool, policy: ToolPolicy, module: Optional[str] = None) -> Callable:
+        '''
+        @desc     : 返回按策略执行 fn 的协程函数
+        @param    : name (str): 工具名
+                    fn (Callable): 工具函数
+                    is_async (bool): fn 是否为协程函数
+                    policy (ToolPolicy): 执行策略
+                    module (str, optional): process 模式下 worker 重新导入的工具模块名
+        @return   : Callable: 协程函数
+        '''
+        if is_async and policy.mode != "inline":
+            raise ValueError(f"tool {name}: async tools can only run inline")
+        self.policies[name] = policy
+        self.running.setdefault(name, 0)
+        self.timeouts.setdefault(name, 0)
+        semaphore = asyncio.Semaphore(policy.concurrency) if policy.concurrency > 0 else None
+
+        def _done(_=None):
+            self.running[name] -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+        async def _start():
+            if semaphore is not None:
+                await semaphore.acquire()
+            self.running[name] += 1
+
+        @functools.wraps(fn)
+        async def run(**kwargs):
+            async def _execute():
+                await _start()
+                if policy.mode == "inline":
+                    try:
+                        return await fn(**kwargs) if is_async else fn(**kwargs)
+                    finally:
+                        _done()
+                loop = asyncio.get_running_loop()
+                try:
+                    if policy.mode == "thread":
+                        future = loop.run_in_executor(self._pool("thread"), functools.partial(fn, **kwargs))
+                    else:
+                        future = loop.run_in_executor(self._pool("process"), _run_in_worker, module, name, kwargs)
+                except BaseException:
+                    _done()
+                    raise
+                # 名额在池中任务真正结束时才归还
+                future.add_done_callback(_done)
+                return await asyncio.shield(future)
+
+            if policy.timeout <= 0:
+                return await _execute()
+            try:
+                return await asyncio.wait_for(_execute(), policy.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts[name] += 1
+                raise TimeoutError(f"tool {name} timed out after {policy.timeout:g}s") from None
+
+        return run
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "mode": policy.mode,
+                "concurrency": policy.concurrency,
+                "timeout": policy.timeout,
+                "running": self.running[name],
+                "timeouts": self.timeouts[name],
+            }
+            for name, policy in self.policies.items()
+        }
+
+
+executor = ToolExecutor()
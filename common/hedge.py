@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   hedge.py
+@Time    :   2025/10/03 16:12:41
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   对冲请求：首个请求超过滚动分位耗时仍未返回时补发一次，取先完成者
+'''
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    '''
+    @name     : Hedger
+    @desc     : 按最近 window 次请求耗时的 percentile 分位作为对冲阈值；
+                每个请求积累 budget 个对冲额度，补发一次消耗 1 个，从而把额外上游流量限制在 budget 比例以内
+    '''
+
+    def __init__(self, enabled: bool, percentile: float = 95.0, budget: float = 0.1, window: int = 200, min_samples: int = 20):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=max(window, 1))
+        # 额度上限：一个统计窗口内允许的对冲次数，避免长时间空闲后集中补发
+        self._max_credits = max(1.0, budget * window)
+        self._credits = 0.0
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def threshold(self) -> Optional[float]:
+        '''
+        @desc     : 当前对冲阈值（秒），样本不足时返回 None 表示不对冲
+        '''
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+    def _take_credit(self) -> bool:
+        if self._credits >= 1:
+            self._credits -= 1
+            return True
+        return False
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        '''
+        @desc     : 执行 fn，必要时补发一次并取消较慢的一方
+        @param    : fn (Callable): 无参协程工厂，两次调用必须可以互换
+        @return   : T: 先成功完成的结果；都失败时抛出首个请求的异常
+        '''
+        if not self.enabled:
+            return await fn()
+
+        self.requests += 1
+        self._credits = min(self._max_credits, self._credits + self.budget)
+        started = time.monotonic()
+        delay = self.threshold()
+        primary = asyncio.create_task(fn())
+        tasks = [primary]
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+            if primary.done() or delay is None or not self._take_credit():
+                result = await primary
+                self._latencies.append(time.monotonic() - started)
+                return result
+
+            self.hedged += 1
+            logger.info(f"hedging after {delay * 1000:.0f}ms")
+            backup = asyncio.create_task(fn())
+            tasks.append(backup)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.cancelled() and t.exception() is None), None)
+                if winner is not None:
+                    if winner is backup:
+                        self.hedge_wins += 1
+                    # 被对冲掉的请求耗时至少为此刻，作为下界计入分位统计
+                    self._latencies.append(time.monotonic() - started)
+                    return winner.result()
+            return await primary
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                # 等落败方处理完取消（归还限流配额、关闭连接）再返回
+                await asyncio.wait(losers)
+
+    def stats(self) -> dict:
+        threshold = self.threshold()
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+            "win_rate": self.hedge_wins / self.hedged if self.hedged else 0.0,
+            "threshold_ms": threshold * 1000 if threshold is not None else None,
+        }
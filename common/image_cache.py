@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   image_cache.py
+@Time    :   2025/09/21 16:05:44
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   生图结果的持久化内容寻址缓存
+'''
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def image_key(model: str, prompt: str, resolution: str) -> str:
+    '''
+    @desc     : 内容寻址键：sha256(model, 包装后的 prompt, 归一化分辨率)
+    '''
+    raw = json.dumps([model, prompt, resolution], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def url_expires(url: str) -> Optional[float]:
+    '''
+    @desc     : 解析签名链接中的 Expires= 参数（unix 秒），没有则返回 None
+    '''
+    try:
+        values = parse_qs(urlparse(url).query).get("Expires")
+        return float(values[0]) if values else None
+    except (ValueError, TypeError):
+        return None
+
+
+class ImageURLCache:
+    '''
+    @name     : ImageURLCache
+    @desc     : 内存字典做 O(1) 查找，追加写 JSONL 日志做持久化，重启后从日志恢复。
+                条目在签名链接过期前 margin 秒失效；磁盘读写都放在线程中执行，不阻塞事件循环。
+    '''
+
+    def __init__(self, directory: str, margin: float = 600.0, default_ttl: float = 3600.0):
+        self.path = os.path.join(directory, "index.jsonl") if directory else ""
+        self.margin = margin
+        self.default_ttl = default_ttl
+        self._index: Dict[str, Tuple[float, str]] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._write_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _deadline(self, url: str) -> float:
+        expires = url_expires(url)
+        if expires is None:
+            return time.time() + self.default_ttl
+        return expires - self.margin
+
+    # ---------- 磁盘 ----------
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    key, deadline, url = entry["key"], entry["deadline"], entry["url"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                if deadline > now:
+                    self._index[key] = (deadline, url)
+                else:
+                    self._index.pop(key, None)
+        # 日志中过期或重复条目过多时压缩
+        if lines > 2 * len(self._index) + 100:
+            self._rewrite()
+        logger.info(f"image cache loaded {len(self._index)} entries from {self.path}")
+
+    def _rewrite(self):
+        tmp = self.path + ".tmp"
+        with self._write_lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for key, (deadline, url) in self._index.items():
+                    f.write(json.dumps({"key": key, "deadline": deadline, "url": url}) + "\n")
+            os.replace(tmp, self.path)
+
+    def _append(self, key: str, deadline: float, url: str):
+        line = json.dumps({"key": key, "deadline": deadline, "url": url}) + "\n"
+        with self._write_lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if not self._loaded:
+                try:
+                    await asyncio.to_thread(self._load)
+                except OSError:
+                    logger.warning(f"image cache load failed: {self.path}", exc_info=True)
+                self._loaded = True
+
+    # ---------- 接口 ----------
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        await self._ensure_loaded()
+        entry = self._index.get(key)
+        if entry is None or entry[0] <= time.time():
+            self._index.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    async def put(self, key: str, url: str):
+        if not self.enabled:
+            return
+        await self._ensure_loaded()
+        deadline = self._deadline(url)
+        if deadline <= time.time():
+            return
+        self._index[key] = (deadline, url)
+        try:
+            await asyncio.to_thread(self._append, key, deadline, url)
+        except OSError:
+            logger.warning(f"image cache write failed: {self.path}", exc_info=True)
+
+    def stats(self) -> dict:
+        return {"size": len(self._index), "hits": self.hits, "misses": self.misses}
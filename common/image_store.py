@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   image_store.py
+@Time    :   2025/10/04 10:27:16
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   生图结果的本地镜像：按内容 sha256 存储，总大小按 LRU 淘汰，mmap 分段读取
+'''
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from common.upstream import upstream
+
+logger = logging.getLogger(__name__)
+
+URI_PREFIX = "resource://images/"
+
+_NAME = re.compile(r"^[0-9a-f]{64}\.(png|jpg|webp|gif)$")
+
+_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+MIME_TYPES = {ext: mime for mime, ext in _EXTENSIONS.items()}
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    '''
+    @desc     : 解析单段 Range 头（bytes=a-b / bytes=a- / bytes=-n），返回 [start, end) 区间
+    @return   : 无 Range 头时返回 (0, size)；无法满足时返回 None
+    '''
+    if not header:
+        return 0, size
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            start, end = max(size - int(last), 0), size
+        else:
+            start = int(first)
+            end = min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+    if start >= end or start >= size:
+        return None
+    return start, end
+
+
+class ImageStore:
+    '''
+    @name     : ImageStore
+    @desc     : 下载一次远程图片，文件名为 <sha256>.<ext>，相同内容只存一份。
+                访问顺序用 OrderedDict 维护并同步到文件 mtime，重启后按 mtime 恢复；
+                超过 max_bytes 时从最久未访问的文件开始删除。磁盘操作都放在线程中执行。
+                HTTP 分段下载在 Starlette 线程池中读取并更新访问顺序，索引的读写都在 _lock 内进行。
+    '''
+
+    def __init__(self, directory: str, max_bytes: int, chunk_size: int = 64 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._by_url: Dict[str, str] = {}
+        self._total = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.reused = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def path(self, name: str) -> str:
+        '''
+        @desc     : 文件名校验后映射到分片目录，非法或不存在时抛出 FileNotFoundError
+        '''
+        if not _NAME.match(name):
+            raise FileNotFoundError(name)
+        return os.path.join(self.directory, name[:2], name)
+
+    # ---------- 索引 ----------
+
+    def _scan(self):
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if _NAME.match(name):
+                        st = os.stat(os.path.join(root, name))
+                        entries.append((st.st_mtime, name, st.st_size))
+        with self._lock:
+            for _, name, size in sorted(entries):
+                self._files[name] = size
+                self._total += size
+        logger.info(f"image store loaded {len(self._files)} files, {self._total} bytes from {self.directory}")
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if not self._loaded:
+                await asyncio.to_thread(self._scan)
+                self._loaded = True
+
+    def touch(self, name: str):
+        with self._lock:
+            if name not in self._files:
+                return
+            self._files.move_to_end(name)
+        try:
+            os.utime(self.path(name))
+        except OSError:
+            pass
+
+    def _evict(self) -> list:
+        '''
+        @desc     : 在 _lock 内调用，从索引中移出最久未访问的文件，并删除指向它们的链接记录
+        '''
+        victims = []
+        while self._total > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._total -= size
+            self.evicted += 1
+            victims.append(name)
+        if victims:
+            removed = set(victims)
+            self._by_url = {url: name for url, name in self._by_url.items() if name not in removed}
+        return victims
+
+    def _remove(self, names: list):
+        for name in names:
+            try:
+                # 已被 mmap 的文件在 Linux 上删除后仍可读到映射结束
+                os.remove(self.path(name))
+            except OSError:
+                logger.warning(f"image store evict failed: {name}", exc_info=True)
+
+    # ---------- 写入 ----------
+
+    async def mirror(self, url: str) -> str:
+        '''
+        @desc     : 把远程图片下载到本地并返回 resource:// URI；同一链接只下载一次
+        @param    : url (str): 远程图片链接
+        @return   : str: resource://images/<sha256>.<ext>
+        '''
+        await self._ensure_loaded()
+        with self._lock:
+            name = self._by_url.get(url)
+            cached = name in self._files
+            if cached:
+                self.reused += 1
+        if cached:
+            self.touch(name)
+            return URI_PREFIX + name
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with upstream.async_client.stream("GET", url) as resp:
+                    resp.raise_for_status()
+                    ext = _EXTENSIONS.get(resp.headers.get("content-type", "").split(";")[0].strip(), "png")
+                    async for chunk in resp.aiter_bytes(self.chunk_size):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+            if not size:
+                raise ValueError(f"empty image from {url[:100]}")
+            name = f"{digest.hexdigest()}.{ext}"
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            await asyncio.to_thread(os.replace, tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self.downloads += 1
+            self._by_url[url] = name
+            if name not in self._files:
+                self._files[name] = size
+                self._total += size
+        self.touch(name)
+        with self._lock:
+            victims = self._evict()
+        if victims:
+            await asyncio.to_thread(self._remove, victims)
+        return URI_PREFIX + name
+
+    # ---------- 读取 ----------
+
+    @contextmanager
+    def open(self, name: str) -> Iterator[mmap.mmap]:
+        '''
+        @desc     : 只读映射整个文件，由内核按页读入，不经过 Python 堆缓冲；空文件无法 mmap，返回空 bytes
+        '''
+        with open(self.path(name), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self.touch(name)
+                yield b""
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.touch(name)
+        try:
+            yield mm
+        finally:
+            try:
+                mm.close()
+            except BufferError:
+                # 仍有 memoryview 在传输层缓冲中，交给垃圾回收关闭
+                pass
+
+    def size(self, name: str) -> int:
+        return os.path.getsize(self.path(name))
+
+    def iter_range(self, name: str, start: int = 0, end: Optional[int] = None) -> Iterator[memoryview]:
+        '''
+        @desc     : 按 chunk_size 逐段产出 [start, end) 区间的 memoryview 切片
+        '''
+        with self.open(name) as mm:
+            end = len(mm) if end is None else min(end, len(mm))
+            view = memoryview(mm)
+            try:
+                for offset in range(start, end, self.chunk_size):
+                    yield view[offset:min(offset + self.chunk_size, end)]
+            finally:
+                view.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "bytes": self._total,
+                "urls": len(self._by_url),
+                "max_bytes": self.max_bytes,
+                "downloads": self.downloads,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   lazy.py
+@Time    :   2025/09/29 19:26:08
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   延迟导入重量级依赖，缩短服务冷启动
+'''
+
+import importlib
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+from typing import Any, Optional
+
+
+class _LazyModule(ModuleType):
+    '''
+    @name     : _LazyModule
+    @desc     : 模块占位，首次访问属性时在锁内完成真正的导入，之后的属性访问都转发给真实模块。
+                不使用 importlib.util.LazyLoader：它在多个线程同时首次访问时会让其中一个线程
+                拿到尚未执行完的模块（如 "module 'numpy' has no attribute 'asarray'"），
+                而同步工具正是在线程池中并发执行的
+    '''
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lock"] = threading.Lock()
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module: Optional[ModuleType] = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> ModuleType:
+    '''
+    @desc     : 返回一个模块占位，首次访问其属性时才真正执行导入；多线程并发首次访问是安全的
+    @param    : name (str): 模块名，如 "numpy"
+    @return   : ModuleType: 模块（已导入过则直接返回）
+    '''
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    return _LazyModule(name)
+
+
+def preload(names: str):
+    '''
+    @desc     : 立即完成导入，用于常驻服务在启动时预热（以冷启动时间换首次调用延迟）
+    @param    : names (str): 逗号分隔的模块名
+    '''
+    for name in filter(None, (n.strip() for n in names.split(","))):
+        importlib.import_module(name)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   limiter.py
+@Time    :   2025/10/02 11:38:50
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   上游自适应限流：令牌桶 + AIMD 并发窗口，按接口/模型分桶
+'''
+
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from setting import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 请求未被上游处理，可安全重排队重试
+RETRYABLE = (429, 503)
+
+
+class UpstreamBusy(Exception):
+    """排队超过截止时间仍未获得上游配额"""
+
+    def __init__(self, key: str, waited: float):
+        super().__init__(f"upstream {key} busy, waited {waited:.1f}s")
+        self.key = key
+        self.retry_after = max(1.0, waited)
+
+
+def status_of(value: Any) -> int:
+    '''
+    @desc     : 从 httpx 响应或 openai 异常中取 HTTP 状态码，取不到时返回 0
+    '''
+    return getattr(value, "status_code", None) or 0
+
+
+def retry_after_of(value: Any) -> Optional[float]:
+    '''
+    @desc     : 从 httpx 响应或 openai 异常（其 response 属性）的 retry-after-ms / Retry-After 头中取建议等待秒数
+    @return   : float | None: 秒数，没有或无法解析时返回 None
+    '''
+    headers = getattr(value, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(value, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            # HTTP-date 格式
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    '''
+    @name     : _Bucket
+    @desc     : 单个接口/模型的令牌桶与并发窗口。等待者按 FIFO 排队，先到先得。
+                上游返回 429 时令牌补充速率与并发窗口一起乘性收缩，之后每个成功请求把速率加性恢复到配置值。
+    '''
+
+    def __init__(self, key: str, rate: float, burst: float, window: float, min_window: float, max_window: float, min_rate: Optional[float] = None):
+        self.key = key
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min(settings.LIMIT_MIN_RATE if min_rate is None else min_rate, rate)
+        self.burst = burst
+        self.tokens = burst
+        self.window = window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self._updated = time.monotonic()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.admitted = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _can_admit(self) -> bool:
+        self._refill()
+        return self.in_flight < int(self.window) and self.tokens >= 1
+
+    def _admit(self):
+        self.tokens -= 1
+        self.in_flight += 1
+        self.admitted += 1
+
+    def drain(self):
+        '''
+        @desc     : 依次放行队首等待者；只因令牌不足而阻塞时，定时到下一个令牌生成再放行
+        '''
+        while self.waiters and self._can_admit():
+            waiter = self.waiters.popleft()
+            if waiter.done():
+                continue
+            self._admit()
+            waiter.set_result(None)
+        if self.waiters and self.in_flight < int(self.window) and self._timer is None:
+            delay = (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.001), self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self.drain()
+
+    async def acquire(self, deadline: float):
+        if not self.waiters and self._can_admit():
+            self._admit()
+            return
+        self.throttled += 1
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self.waiters.append(waiter)
+        self.drain()
+        started = loop.time()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max(deadline - loop.time(), 0))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时与放行同时发生：已占用的配额要归还
+                self.release(0, count=False)
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise UpstreamBusy(self.key, loop.time() - started) from None
+            raise
+
+    def release(self, status: int, count: bool = True):
+        saturated = self.in_flight >= int(self.window)
+        self.in_flight -= 1
+        if count:
+            if status == 429 or status >= 500 or status == 0:
+                # 乘性减：过载或异常时迅速收缩并发窗口
+                self.window = max(self.min_window, self.window * settings.LIMIT_DECREASE)
+            elif saturated:
+                # 加性增：只在窗口被占满时增长，大约每一个窗口的成功请求把窗口扩大 1
+                self.window = min(self.max_window, self.window + 1 / self.window)
+            if status == 429:
+                # 429 是速率超限：并发窗口之外还要降低发送速率，先按旧速率结算已生成的令牌
+                self._refill()
+                self.rate = max(self.min_rate, self.rate * settings.LIMIT_DECREASE)
+            elif 200 <= status < 400 and self.rate < self.max_rate:
+                # 每个成功请求恢复配置速率的 5%
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+        self.drain()
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "window": round(self.window, 2),
+            "rate": round(self.rate, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "tokens": round(self.tokens, 2),
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
+
+
+class AdaptiveLimiter:
+    '''
+    @name     : AdaptiveLimiter
+    @desc     : 进程内共享的上游限流器。key 形如 "images:cogview-3-flash"，
+                每个 key 的速率、突发量与窗口可通过 LIMIT_OVERRIDES 单独配置。
+    '''
+
+    def __init__(self):
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def bucket(self, key: str) -> _Bucket:
+        b = self._buckets.get(key)
+        if b is None:
+            conf = {
+                "rate": settings.LIMIT_RATE,
+                "burst": settings.LIMIT_BURST,
+                "window": settings.LIMIT_INITIAL_WINDOW,
+                "min_window": settings.LIMIT_MIN_WINDOW,
+                "max_window": settings.LIMIT_MAX_WINDOW,
+                **settings.LIMIT_OVERRIDES.get(key, {}),
+            }
+            b = self._buckets[key] = _Bucket(key, **conf)
+        return b
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return asyncio.get_running_loop().time() + (settings.LIMIT_QUEUE_TIMEOUT if timeout is None else timeout)
+
+    @asynccontextmanager
+    async def slot(self, key: str, timeout: Optional[float] = None):
+        '''
+        @desc     : 占用一个上游配额直到代码块结束，适合流式响应；异常的状态码参与 AIMD 调整
+        '''
+        bucket = self.bucket(key)
+        await bucket.acquire(self._deadline(timeout))
+        # 代码块被取消（调用方超时、对冲落败等）时 status 保持 None：归还配额但不参与 AIMD 调整
+        status = None
+        try:
+            yield bucket
+            status = 200
+        except Exception as e:
+            status = status_of(e)
+            raise
+        finally:
+            bucket.release(status or 0, count=status is not None)
+
+    def _backoff(self, key: str, status: int, source: Any, attempt: int, deadline: float) -> Optional[float]:
+        '''
+        @desc     : 429/503 重排队前的等待时间：优先用上游的 Retry-After，否则为带抖动的指数退避
+        @return   : float | None: 等待秒数；不可重试或等待后已超过截止时间时返回 None
+        '''
+        if status not in RETRYABLE:
+            return None
+        delay = retry_after_of(source)
+        if delay is None:
+            # 等量抖动：[cap/2, cap)，避免同时被限流的请求在同一时刻重试
+            cap = min(settings.LIMIT_RETRY_BACKOFF_MAX, settings.LIMIT_RETRY_BACKOFF * 2 ** attempt)
+            delay = cap / 2 + random.uniform(0, cap / 2)
+        if asyncio.get_running_loop().time() + delay >= deadline:
+            return None
+        logger.info(f"upstream {key} returned {status}, requeue after {delay:.2f}s")
+        return delay
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        '''
+        @desc     : 排队获取配额后执行 fn；上游返回 429/503 时退避后在截止时间内重新排队重试
+        @param    : key (str): 接口/模型分桶键
+                    fn (Callable): 无参协程工厂，返回 httpx 响应或 SDK 结果
+                    timeout (float, optional): 排队截止时间，默认 LIMIT_QUEUE_TIMEOUT
+        @return   : T: fn 的结果
+        '''
+        bucket = self.bucket(key)
+        deadline = self._deadline(timeout)
+        attempt = 0
+        while True:
+            await bucket.acquire(deadline)
+            # 调用方被取消时 status 保持 None：归还配额但不参与 AIMD 调整
+            status = None
+            try:
+                try:
+                    result = await fn()
+                except Exception as e:
+                    status = status_of(e)
+                    delay = self._backoff(key, status, e, attempt, deadline)
+                    if delay is None:
+                        raise
+                else:
+                    status = status_of(result) or 200
+                    delay = self._backoff(key, status, result, attempt, deadline)
+                    if delay is None:
+                        return result
+            finally:
+                bucket.release(status or 0, count=status is not None)
+            # 退避期间不占用配额
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {key: b.stats() for key, b in self._buckets.items()}
+
+
+limiter = AdaptiveLimiter()
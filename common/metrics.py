@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   metrics.py
+@Time    :   2025/09/27 14:02:36
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   工具调用指标：延迟直方图、在途数、错误数、上游 HTTP 耗时
+'''
+
+import functools
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 当前正在执行的工具名，供上游 HTTP 钩子归属耗时
+current_tool: ContextVar[str] = ContextVar("current_tool", default="")
+# 当前调用是否以错误结果返回；用可变容器，工具内部创建的子任务也能标记
+_call_failed: ContextVar[Optional[List[bool]]] = ContextVar("_call_failed", default=None)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    '''
+    @name     : Histogram
+    @desc     : 固定桶直方图，observe 只做一次二分查找和两次加法
+    '''
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class ToolMetrics:
+    '''
+    @name     : ToolMetrics
+    @desc     : 进程内的工具指标注册表，按 Prometheus 文本格式导出
+    '''
+
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.upstream: Dict[Tuple[str, str], Histogram] = {}
+
+    def _start(self, name: str):
+        self.in_flight[name] = self.in_flight.get(name, 0) + 1
+        return (current_tool.set(name), _call_failed.set([False])), time.perf_counter()
+
+    def _finish(self, name: str, token, started: float, failed: bool):
+        self.latency.setdefault(name, Histogram()).observe(time.perf_counter() - started)
+        self.in_flight[name] -= 1
+        tool_token, failed_token = token
+        if failed or _call_failed.get()[0]:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        _call_failed.reset(failed_token)
+        current_tool.reset(tool_token)
+
+    def count_error(self):
+        '''
+        @desc     : 工具以返回值（而非异常）报告失败时调用，当前调用计入错误数；同一次调用多次标记只计一次
+        '''
+        failed = _call_failed.get()
+        if failed is not None:
+            failed[0] = True
+
+    def wrap(self, name: str, fn: Callable, is_async: bool) -> Callable:
+        '''
+        @desc     : 包装工具函数，记录延迟、在途数与错误（抛出异常或调用了 count_error）
+        '''
+        self.latency.setdefault(name, Histogram())
+        self.in_flight.setdefault(name, 0)
+        self.errors.setdefault(name, 0)
+
+        if is_async:
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                token, started = self._start(name)
+                failed = True
+                try:
+                    result = await fn(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    self._finish(name, token, started, failed)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            token, started = self._start(name)
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self._finish(name, token, started, failed)
+        return wrapper
+
+    def observe_upstream(self, path: str, seconds: float):
+        '''
+        @desc     : 记录上游 HTTP 耗时（发出请求到收到响应头），归属到当前工具
+        '''
+        key = (current_tool.get() or "-", path)
+        self.upstream.setdefault(key, Histogram()).observe(seconds)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP mcp_tool_latency_seconds Tool call latency.",
+            "# TYPE mcp_tool_latency_seconds histogram",
+        ]
+        for name, hist in self.latency.items():
+            lines.extend(hist.render("mcp_tool_latency_seconds", f'tool="{name}"'))
+        lines += ["# HELP mcp_tool_in_flight Tool calls in progress.", "# TYPE mcp_tool_in_flight gauge"]
+        lines += [f'mcp_tool_in_flight{{tool="{name}"}} {n}' for name, n in self.in_flight.items()]
+        lines += ["# HELP mcp_tool_errors_total Tool calls that raised or returned an error result.", "# TYPE mcp_tool_errors_total counter"]
+        lines += [f'mcp_tool_errors_total{{tool="{name}"}} {n}' for name, n in self.errors.items()]
+        lines += [
+            "# HELP mcp_upstream_latency_seconds Upstream HTTP time to response headers.",
+            "# TYPE mcp_upstream_latency_seconds histogram",
+        ]
+        for (tool, path), hist in self.upstream.items():
+            lines.extend(hist.render("mcp_upstream_latency_seconds", f'tool="{tool}",path="{path}"'))
+        return "\n".join(lines) + "\n"
+
+
+metrics = ToolMetrics()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   search_results.py
+@Time    :   2025/10/07 14:33:27
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   搜索结果结构化：解析来源、去除重复句子、按相关度在字符/token 预算内选取片段
+'''
+
+import math
+import re
+from typing import Dict, List, Optional, Set
+
+from common.semantic_cache import tokenize
+
+_SENTENCE = re.compile(r"[^。！？!?；;\n]+[。！？!?；;]?")
+_WHITESPACE = re.compile(r"\s+")
+
+# 标题、链接、字段名等在结果 JSON 中的固定开销（字符）
+SOURCE_OVERHEAD = 40
+
+
+def estimate_tokens(text: str) -> int:
+    '''
+    @desc     : 与 clients/history.py 相同的粗略估算：非 ASCII 字符按 1 个，ASCII 按 4 个字符 1 个
+    '''
+    if not text:
+        return 0
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def parse_sources(response: dict) -> List[Dict[str, str]]:
+    '''
+    @desc     : 从 web-search-pro 响应中取出 search_result 列表；没有结构化结果时把回答正文作为单个来源
+    @return   : List[Dict]: [{"title", "url", "content"}]
+    '''
+    sources, texts = [], []
+    for choice in response.get("choices", []):
+        message = choice.get("message") or {}
+        for call in message.get("tool_calls") or []:
+            for item in call.get("search_result") or []:
+                content = item.get("content") or ""
+                if content:
+                    sources.append({
+                        "title": (item.get("title") or "").strip(),
+                        "url": item.get("link") or "",
+                        "content": content,
+                    })
+        if message.get("content"):
+            texts.append(message["content"])
+    if not sources and texts:
+        sources.append({"title": "", "url": "", "content": "\n\n".join(texts)})
+    return sources
+
+
+def _features(text: str) -> Set[str]:
+    tokens = tokenize(text)
+    return set(tokens) | {a + b for a, b in zip(tokens, tokens[1:])}
+
+
+def _sentences(text: str) -> List[str]:
+    return [s for s in (_WHITESPACE.sub(" ", m.group()).strip() for m in _SENTENCE.finditer(text)) if s]
+
+
+def select_snippets(
+    query: str,
+    sources: List[Dict[str, str]],
+    max_results: int = 5,
+    max_chars: int = 2000,
+    max_tokens: Optional[int] = None,
+) -> List[Dict[str, str]]:
+    '''
+    @desc     : 按与查询的词元重合度给句子打分，跨来源去掉重复句子，
+                再按来源得分从高到低、句子得分从高到低填充预算，片段内保持原文顺序
+    @param    : query (str): 搜索内容
+                sources (List[Dict]): parse_sources 的结果
+                max_results (int): 最多返回的来源数
+                max_chars (int): 所有来源标题、链接与片段的总字符预算
+                max_tokens (int, optional): 总 token 预算，与 max_chars 同时生效
+    @return   : List[Dict]: [{"title", "url", "snippet"}]
+    '''
+    wanted = _features(query)
+    seen: List[Set[str]] = []
+    ranked = []
+    for order, source in enumerate(sources):
+        title_score = len(wanted & _features(source["title"]))
+        scored = []
+        for position, sentence in enumerate(_sentences(source["content"])):
+            features = _features(sentence)
+            if not features:
+                continue
+            # 与已收录句子高度重合（Jaccard >= 0.8）视为冗余
+            if any(len(features & f) >= 0.8 * len(features | f) for f in seen):
+                continue
+            seen.append(features)
+            hits = len(wanted & features)
+            score = hits / math.sqrt(len(features)) + 0.1 / (position + 1)
+            scored.append((score, position, sentence, hits))
+        if scored:
+            best = max(s[0] for s in scored)
+            relevant = title_score > 0 or any(s[3] for s in scored)
+            ranked.append((best + 0.5 * title_score, -order, source, scored, relevant))
+    # 有与查询相关的来源时，丢弃完全不相关的来源
+    if any(r[4] for r in ranked):
+        ranked = [r for r in ranked if r[4]]
+    ranked.sort(key=lambda r: (r[0], r[1]), reverse=True)
+
+    def cost(text: str) -> int:
+        # 同时满足两种预算：把 token 数按比例折算成字符后取较大者
+        return max(len(text), estimate_tokens(text) * max_chars // max_tokens) if max_tokens else len(text)
+
+    remaining = max_chars
+    picked = []
+    for _, _, source, scored, _ in ranked[:max(max_results, 0)]:
+        overhead = SOURCE_OVERHEAD + cost(source["title"]) + cost(source["url"])
+        if overhead >= remaining:
+            break
+        remaining -= overhead
+        picked.append((source, scored))
+
+    # 先保证每个来源各有一句最相关的，剩余预算再按全局得分分配给与查询有重合的句子（广告、导航等被略去）
+    firsts, rest = [], []
+    for index, (_, scored) in enumerate(picked):
+        ordered = sorted(scored, reverse=True)
+        firsts.append((index, ordered[0]))
+        rest.extend((index, item) for item in ordered[1:] if item[3])
+    rest.sort(key=lambda r: r[1][0], reverse=True)
+
+    chosen: Dict[int, List] = {index: [] for index in range(len(picked))}
+    for index, (_, position, sentence, _) in firsts + rest:
+        size = cost(sentence)
+        if size <= remaining:
+            chosen[index].append((position, sentence))
+            remaining -= size
+        elif not chosen[index] and remaining > 0:
+            # 首句放不下时截断，避免来源只剩标题
+            keep = max(remaining * len(sentence) // size - 1, 0)
+            chosen[index].append((position, sentence[:keep].rstrip() + "…"))
+            remaining = 0
+
+    return [
+        {"title": source["title"], "url": source["url"], "snippet": " ".join(s for _, s in sorted(chosen[index]))}
+        for index, (source, _) in enumerate(picked)
+        if chosen[index]
+    ]
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   semantic_cache.py
+@Time    :   2025/09/22 10:31:20
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   基于本地向量索引的近似查询缓存
+'''
+
+from __future__ import annotations
+
+import time
+import unicodedata
+import zlib
+from typing import Any, List, Optional
+
+from common.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+# 不影响查询含义的虚词，比较内容词序列时忽略
+STOP_TOKENS = frozenset("的了吗呢啊吧呀么怎样请问") | frozenset(
+    ["a", "an", "the", "in", "of", "for", "is", "what", "how", "s", "please"]
+)
+
+
+def tokenize(text: str) -> List[str]:
+    '''
+    @desc     : CJK 按字切分，字母数字按词切分，去掉空白、标点与虚词
+    '''
+    tokens, word = [], []
+    for c in unicodedata.normalize("NFKC", text).casefold():
+        if c.isascii() and c.isalnum():
+            word.append(c)
+            continue
+        if word:
+            tokens.append("".join(word))
+            word = []
+        if not (c.isspace() or unicodedata.category(c)[0] in "PSZC"):
+            tokens.append(c)
+    if word:
+        tokens.append("".join(word))
+    return [t for t in tokens if t not in STOP_TOKENS]
+
+
+def embed(tokens: List[str], dim: int) -> np.ndarray:
+    '''
+    @desc     : 词元 unigram + bigram 哈希到 dim 维计数向量（无需网络、无需模型），L2 归一化
+    @param    : tokens (List[str]): tokenize 的结果
+                dim (int): 向量维度
+    @return   : np.ndarray: float32 单位向量
+    '''
+    vec = np.zeros(dim, dtype=np.float32)
+    for t in tokens:
+        vec[zlib.crc32(t.encode("utf-8")) % dim] += 1.0
+    for a, b in zip(tokens, tokens[1:]):
+        vec[zlib.crc32(f"{a}\x00{b}".encode("utf-8")) % dim] += 0.5
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+class SemanticCache:
+    '''
+    @name     : SemanticCache
+    @desc     : 固定容量的环形向量索引，一次矩阵乘完成全部余弦相似度计算。
+                相似度达到 threshold 的候选再校验内容词序列是否一致（strict），
+                避免 "今天北京天气" 命中 "明天北京天气" 这类一字之差的查询；
+                按顺序比较，"上海到北京" 与 "北京到上海" 这类词相同、顺序不同的查询也不会互相命中。
+                写满后覆盖最旧条目，内存上限约为 capacity * dim * 4 字节。
+    '''
+
+    def __init__(self, capacity: int, threshold: float, ttl: float, dim: int = 512, strict: bool = True):
+        capacity = max(capacity, 0)
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dim = dim
+        self.strict = strict
+        # 向量矩阵在首次使用时分配，避免导入期加载 numpy
+        self._vectors: Optional[np.ndarray] = None
+        self._expires: Optional[np.ndarray] = None
+        self._token_seqs: List[Optional[tuple]] = [None] * capacity
+        self._values: List[Any] = [None] * capacity
+        self._next = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0 and self.ttl > 0
+
+    def _ensure_index(self):
+        if self._vectors is None:
+            self._vectors = np.zeros((self.capacity, self.dim), dtype=np.float32)
+            self._expires = np.zeros(self.capacity, dtype=np.float64)
+
+    def get(self, text: str) -> Any:
+        '''
+        @desc     : 查找最相似且未过期的条目
+        @param    : text (str): 查询文本
+        @return   : Any: 命中的值，未命中返回 None
+        '''
+        if not self.enabled:
+            return None
+        self._ensure_index()
+        tokens = tokenize(text)
+        if tokens:
+            sims = self._vectors @ embed(tokens, self.dim)
+            sims[self._expires <= time.monotonic()] = -1.0
+            candidates = np.flatnonzero(sims >= self.threshold)
+            token_seq = tuple(tokens)
+            for idx in candidates[np.argsort(-sims[candidates])]:
+                if not self.strict or self._token_seqs[idx] == token_seq:
+                    self.hits += 1
+                    return self._values[idx]
+        self.misses += 1
+        return None
+
+    def add(self, text: str, value: Any):
+        if not self.enabled:
+            return
+        self._ensure_index()
+        tokens = tokenize(text)
+        if not tokens:
+            return
+        idx = self._next
+        self._vectors[idx] = embed(tokens, self.dim)
+        self._expires[idx] = time.monotonic() + self.ttl
+        self._token_seqs[idx] = tuple(tokens)
+        self._values[idx] = value
+        self._next = (idx + 1) % self.capacity
+
+    def stats(self) -> dict:
+        alive = 0 if self._expires is None else int(np.count_nonzero(self._expires > time.monotonic()))
+        return {
+            "size": alive,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
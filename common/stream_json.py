@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   stream_json.py
+@Time    :   2025/09/20 15:36:02
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   流式 JSON 增量解析
+'''
+
+import json
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class SceneStreamParser:
+    '''
+    @name     : SceneStreamParser
+    @desc     : 增量解析 {"list": [{...}, {...}]} 结构，
+                每当数组中的一个对象闭合就立即产出，无需等待整个 JSON 完成。
+                根对象之前的内容（如 ```json 代码块标记）会被忽略。
+    '''
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._item_start = -1
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        '''
+        @desc     : 喂入一段文本
+        @param    : chunk (str): 流式返回的增量文本
+        @return   : List[Dict]: 本次新完成的场景对象
+        '''
+        self.text += chunk
+        items = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._stack == ["{", "["]:
+                    self._item_start = i
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if ch == "}" and self._stack == ["{", "["] and self._item_start >= 0:
+                    try:
+                        items.append(json.loads(text[self._item_start:i + 1]))
+                    except json.JSONDecodeError:
+                        logger.warning(f"skip malformed scene: {text[self._item_start:i + 1][:100]!r}")
+                    self._item_start = -1
+        self._pos = len(text)
+        return items
+
+    def result(self, scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        '''
+        @desc     : 流结束后返回完整结果，整体解析失败时用已解析的场景兜底
+        @param    : scenes (List[Dict]): 增量解析得到的场景
+        @return   : Dict: {"list": [...]}
+        '''
+        start, end = self.text.find("{"), self.text.rfind("}")
+        if 0 <= start < end:
+            try:
+                return json.loads(self.text[start:end + 1])
+            except json.JSONDecodeError:
+                pass
+        return {"list": scenes}
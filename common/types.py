@@ -9,6 +9,7 @@
 '''
 
 from enum import Enum
+from mcp.types import ToolAnnotations
 
 
 class Language(str, Enum):
@@ -25,4 +26,7 @@ LANGUAGE_NAMES = {
     Language.ENGLISH_US: "English",
     Language.JAPANESE: "日本語",
     Language.KOREAN: "한국어"
-}
\ No newline at end of file
+}
+
+# 纯函数工具：只依赖参数、无副作用、不访问外部服务，客户端可本地执行或按参数缓存结果
+PURE_TOOL = ToolAnnotations(readOnlyHint=True, idempotentHint=True, destructiveHint=False, openWorldHint=False)
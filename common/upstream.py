@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   upstream.py
+@Time    :   2025/09/20 10:12:31
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   BigModel 上游共享连接池
+'''
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from common.lazy import lazy_import
+from common.metrics import metrics
+from setting import settings
+
+logger = logging.getLogger(__name__)
+
+# openai SDK 导入较重，推迟到首次使用
+openai = lazy_import("openai")
+
+
+class UpstreamPool:
+    '''
+    @name     : UpstreamPool
+    @desc     : 所有工具共用的 keep-alive 连接池，由 FastMCP lifespan 管理生命周期。
+                SSE 模式下每个会话都会进入一次 lifespan，因此用引用计数保证进程内只有一个池；
+                sse / streamable-http 还在 Starlette lifespan 中持有进程级引用，池随进程存活。
+    '''
+
+    def __init__(self):
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_openai: Optional["openai.AsyncOpenAI"] = None
+        self._refs = 0
+        self.requests = 0
+        self.new_connections = 0
+
+    # ---------- 配置 ----------
+
+    def _http2(self) -> bool:
+        if not settings.HTTP2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2 已开启但未安装 h2，回退到 HTTP/1.1")
+            return False
+        return True
+
+    def _client_kwargs(self) -> dict:
+        return {
+            "proxy": settings.PROXY,
+            "http2": self._http2(),
+            "limits": httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            "timeout": httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        }
+
+    # ---------- 连接复用计数 ----------
+    # httpcore 的 trace 扩展在新建 TCP 连接时会回调 connection.connect_tcp.*，
+    # 没有该事件的请求即复用了已有连接。
+
+    def _on_trace(self, name: str, info: dict):
+        if name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    async def _on_atrace(self, name: str, info: dict):
+        self._on_trace(name, info)
+
+    async def _on_arequest(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._on_atrace
+        request.extensions["started"] = time.perf_counter()
+
+    async def _on_aresponse(self, response: httpx.Response):
+        started = response.request.extensions.get("started")
+        if started is not None:
+            metrics.observe_upstream(response.request.url.path, time.perf_counter() - started)
+
+    # ---------- 客户端 ----------
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                event_hooks={"request": [self._on_arequest], "response": [self._on_aresponse]},
+                **self._client_kwargs(),
+            )
+        return self._async_client
+
+    @property
+    def async_openai(self) -> "openai.AsyncOpenAI":
+        if self._async_openai is None:
+            self._async_openai = openai.AsyncOpenAI(
+                api_key=settings.API_KEY,
+                base_url=settings.BIGMODEL_BASE_URL,
+                http_client=self.async_client,
+                # 429/5xx 的重试交给 common.limiter 排队，避免 SDK 自行重试绕过 AIMD 退避
+                max_retries=0,
+            )
+        return self._async_openai
+
+    def stats(self) -> dict:
+        '''
+        @desc     : 连接复用统计
+        @return   : dict: requests / new_connections / reused_connections
+        '''
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": max(self.requests - self.new_connections, 0),
+        }
+
+    # ---------- 生命周期 ----------
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_openai = None
+        logger.info(f"upstream pool closed: {self.stats()}")
+
+    @asynccontextmanager
+    async def lifespan(self):
+        '''
+        @desc     : 供 FastMCP lifespan 使用，最后一个会话退出时关闭连接池
+        '''
+        self._refs += 1
+        try:
+            yield self
+        finally:
+            self._refs -= 1
+            if self._refs == 0:
+                await self.aclose()
+
+
+upstream = UpstreamPool()
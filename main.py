@@ -9,25 +9,153 @@
 """
 
 import logging
+from contextlib import asynccontextmanager
 from mcp.server import FastMCP
 from tools import register_tools
+from common.lazy import preload
+from common.admission import admission
+from common.executor import executor
+from common.limiter import limiter
+from common.metrics import metrics
+from common.upstream import upstream
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 from setting import settings
 
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastMCP):
+    """
+    @desc     : 服务生命周期内共享上游连接池
+    """
+    async with upstream.lifespan() as pool:
+        yield {"upstream": pool}
+
+
 app = FastMCP(
     "mcp-serve",
     host=settings.MCP_HOST,
     port=settings.MCP_PORT,
+    lifespan=lifespan,
 )
 
 register_tools(app)
+preload(settings.PRELOAD_MODULES)
+
+
+@app.resource("stats://upstream")
+def upstream_stats() -> dict:
+    """上游连接池复用统计"""
+    return upstream.stats()
+
+
+@app.resource("stats://limiter")
+def limiter_stats() -> dict:
+    """各上游分桶的并发窗口、排队数与限流统计"""
+    return limiter.stats()
+
+
+@app.resource("stats://executor")
+def executor_stats() -> dict:
+    """各工具的执行方式、并发上限、超时与在途数"""
+    return executor.stats()
+
+
+@app.resource("stats://admission")
+def admission_stats() -> dict:
+    """各准入分道的在途数、排队数与拒绝统计"""
+    return admission.stats()
+
+
+@app.resource("metrics://tools", mime_type="text/plain")
+def tool_metrics() -> str:
+    """工具延迟、在途数、错误数与上游耗时（Prometheus 文本格式）"""
+    return metrics.render()
+
+
+@app.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def http_app():
+    """
+    @desc     : streamable-http 应用工厂，供 uvicorn 在每个 worker 进程内调用。
+                使用无状态模式，任意 worker 都能处理任意请求；
+                连接池在进程存活期间常驻，不随单次请求的 MCP 会话开关。
+    """
+    app.settings.stateless_http = True
+    starlette_app = app.streamable_http_app()
+    session_lifespan = starlette_app.router.lifespan_context
+
+    @asynccontextmanager
+    async def process_lifespan(starlette_app):
+        async with upstream.lifespan(), session_lifespan(starlette_app):
+            yield
+
+    starlette_app.router.lifespan_context = process_lifespan
+    return starlette_app
+
+
+def sse_app():
+    """
+    @desc     : sse 应用。FastMCP 会为每个 SSE 会话进入一次 lifespan，
+                这里在 Starlette lifespan 中持有一份进程级引用，最后一个会话断开时连接池也不会关闭。
+    """
+    starlette_app = app.sse_app()
+    session_lifespan = starlette_app.router.lifespan_context
+
+    @asynccontextmanager
+    async def process_lifespan(starlette_app):
+        async with upstream.lifespan(), session_lifespan(starlette_app):
+            yield
+
+    starlette_app.router.lifespan_context = process_lifespan
+    return starlette_app
+
+
+def run_sse():
+    """
+    @desc     : 单进程运行 sse
+    """
+    import uvicorn
+
+    uvicorn.run(
+        sse_app(),
+        host=settings.MCP_HOST,
+        port=settings.MCP_PORT,
+        log_level=app.settings.log_level.lower(),
+    )
+
+
+def run_http():
+    """
+    @desc     : 多 worker 运行 streamable-http。
+                由 uvicorn 主进程绑定端口后 pre-fork 出 MCP_WORKERS 个 worker 共享监听 socket，
+                worker 异常退出会被自动拉起，向主进程发送 SIGHUP 可滚动重启全部 worker。
+    """
+    import uvicorn
+
+    uvicorn.run(
+        "main:http_app",
+        factory=True,
+        host=settings.MCP_HOST,
+        port=settings.MCP_PORT,
+        workers=settings.MCP_WORKERS,
+        timeout_graceful_shutdown=settings.MCP_GRACEFUL_TIMEOUT,
+        log_level=app.settings.log_level.lower(),
+    )
+
 
 if __name__ == "__main__":
     transport = settings.MCP_TRANSPORT
     if transport == "sse":
-        app.run(transport=transport)
+        run_sse()
     elif transport == "stdio":
         app.run(transport=transport)
+    elif transport == "streamable-http":
+        run_http()
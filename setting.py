@@ -25,9 +25,101 @@ class Settings(BaseSettings):
 
     API_KEY: str = Field("", description="调用 BigModel 的 API Key")
     PROXY: str | None = Field(None, description="代理地址，例如 http://127.0.0.1:7890")
-    MCP_TRANSPORT: str = Field("stdio", description="MCP 传输方式: stdio 或 tcp")
+    MCP_TRANSPORT: str = Field("stdio", description="MCP 传输方式: stdio、sse 或 streamable-http")
     MCP_HOST: str = Field("0.0.0.0", description="MCP TCP 模式下的监听地址")
     MCP_PORT: int = Field(5000, description="MCP TCP 模式下的监听端口")
+    MCP_WORKERS: int = Field(1, description="streamable-http 模式下的 worker 进程数")
+    MCP_GRACEFUL_TIMEOUT: int = Field(30, description="worker 优雅退出/重启时等待在途请求的秒数")
+    PRELOAD_MODULES: str = Field("", description="启动时预加载的重量级模块，逗号分隔，如 openai,numpy；默认首次调用时加载")
+
+    BIGMODEL_BASE_URL: str = Field("https://open.bigmodel.cn/api/paas/v4", description="BigModel 接口地址")
+    HTTP2: bool = Field(False, description="上游连接是否启用 HTTP/2（需安装 h2）")
+    HTTP_MAX_CONNECTIONS: int = Field(100, description="上游连接池最大连接数")
+    HTTP_MAX_KEEPALIVE: int = Field(20, description="上游连接池最大保活连接数")
+    HTTP_KEEPALIVE_EXPIRY: float = Field(30.0, description="保活连接空闲过期时间（秒）")
+    HTTP_CONNECT_TIMEOUT: float = Field(10.0, description="上游建立连接超时（秒）")
+    HTTP_READ_TIMEOUT: float = Field(60.0, description="上游读取超时（秒）")
+
+    IMAGE_CONCURRENCY: int = Field(4, description="单次 generate_image 调用的默认并发数")
+    IMAGE_MAX_CONCURRENCY: int = Field(8, description="进程内生图请求的全局并发上限")
+    IMAGE_CACHE_DIR: str = Field(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "images"),
+        description="生图结果缓存目录，为空则关闭缓存",
+    )
+    IMAGE_CACHE_MARGIN: float = Field(600.0, description="签名链接过期前提前失效的秒数")
+    IMAGE_CACHE_TTL: float = Field(3600.0, description="链接不带 Expires 时的缓存时间（秒）")
+
+    IMAGE_MIRROR: bool = Field(False, description="是否把生成的图片下载到本地，返回 resource://images/ 地址而不是会过期的签名链接")
+    IMAGE_MIRROR_DIR: str = Field(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "mirror"),
+        description="本地图片镜像目录",
+    )
+    IMAGE_MIRROR_MAX_BYTES: int = Field(1024 ** 3, description="本地图片镜像总大小上限（字节），超出按 LRU 淘汰")
+    IMAGE_MIRROR_CHUNK: int = Field(64 * 1024, description="图片下载与分段读取的块大小（字节）")
+
+    LIMIT_RATE: float = Field(10.0, description="每个上游接口/模型的令牌补充速率（请求/秒）")
+    LIMIT_BURST: float = Field(20.0, description="令牌桶容量，即允许的瞬时突发请求数")
+    LIMIT_INITIAL_WINDOW: float = Field(8.0, description="AIMD 并发窗口初始值")
+    LIMIT_MIN_WINDOW: float = Field(1.0, description="AIMD 并发窗口下限")
+    LIMIT_MAX_WINDOW: float = Field(64.0, description="AIMD 并发窗口上限")
+    LIMIT_DECREASE: float = Field(0.5, description="遇到 429/5xx 时并发窗口的收缩系数；429 时令牌补充速率按同一系数收缩")
+    LIMIT_MIN_RATE: float = Field(0.5, description="429 收缩后令牌补充速率的下限（请求/秒）")
+    LIMIT_RETRY_BACKOFF: float = Field(0.5, description="429/503 重排队前的初始退避（秒），之后每次翻倍并加随机抖动；上游给出 Retry-After 时以其为准")
+    LIMIT_RETRY_BACKOFF_MAX: float = Field(10.0, description="429/503 重排队退避的上限（秒）")
+    LIMIT_QUEUE_TIMEOUT: float = Field(30.0, description="排队等待上游配额的截止时间（秒），超时快速失败")
+    LIMIT_OVERRIDES: dict[str, dict[str, float]] = Field(
+        default_factory=dict,
+        description='按分桶键覆盖限流参数，JSON 格式，如 {"images:cogview-3-flash": {"rate": 2, "max_window": 4}}',
+    )
+
+    TOOL_SYNC_MODE: str = Field("thread", description="同步工具的默认执行方式：inline / thread / process；异步工具始终 inline")
+    TOOL_THREAD_WORKERS: int = Field(8, description="同步工具线程池大小")
+    TOOL_PROCESS_WORKERS: int = Field(2, description="CPU 密集工具进程池大小")
+    TOOL_MAX_CONCURRENCY: int = Field(16, description="thread / process 模式工具默认的最大并发执行数，0 表示不限；inline 工具默认不限")
+    TOOL_EXEC_TIMEOUT: float = Field(300.0, description="thread / process 模式工具默认的排队加执行超时（秒），0 表示不限；inline 工具默认不限")
+    TOOL_POLICIES: dict[str, dict[str, str | float]] = Field(
+        default_factory=dict,
+        description='按工具名覆盖执行策略，JSON 格式，如 {"evaluate": {"mode": "process", "concurrency": 2, "timeout": 10}}',
+    )
+
+    ADMISSION_CONTROL: bool = Field(True, description="sse / streamable-http 模式下是否对工具调用做准入控制")
+    ADMISSION_LANES: dict[str, dict[str, float]] = Field(
+        default_factory=lambda: {
+            "interactive": {"max_in_flight": 64, "max_queue": 256, "client_max_in_flight": 16, "timeout": 2},
+            "standard": {"max_in_flight": 32, "max_queue": 128, "client_max_in_flight": 4, "timeout": 30},
+            "batch": {"max_in_flight": 8, "max_queue": 32, "client_max_in_flight": 2, "timeout": 60},
+        },
+        description="准入分道：全局在途上限、等待队列长度、单客户端在途上限、排队截止时间（秒），JSON 格式",
+    )
+    ADMISSION_CLIENT_KEY: str = Field(
+        "session", description="单客户端上限按什么区分客户端：session 为每个 MCP 会话，ip 为来源地址（同一主机的多个会话合并计算）"
+    )
+    ADMISSION_TRUSTED_CLIENTS: list[str] = Field(
+        default_factory=list,
+        description='不受单客户端上限约束的来源 IP，JSON 格式，如 ["127.0.0.1"]；用于经单个 MCP 会话多路复用大量用户的客户端（clients/chat_server.py）',
+    )
+    ADMISSION_TOOL_LANES: dict[str, str] = Field(
+        default_factory=dict,
+        description='按工具名指定分道（须在 ADMISSION_LANES 中定义），JSON 格式，如 {"generate_illustrated_story": "batch"}；未指定时纯函数工具走 interactive，其余走 standard',
+    )
+
+    MATH_MAX_ITEMS: int = Field(100000, description="批量数学工具单个数组的最大元素数")
+    MATH_MAX_EXPRESSION_LENGTH: int = Field(2000, description="evaluate 表达式最大长度")
+
+    SEARCH_CACHE_TTL: float = Field(300.0, description="web_search 结果缓存时间（秒），0 表示关闭")
+    SEARCH_CACHE_SIZE: int = Field(1024, description="web_search 结果缓存最大条目数")
+    SEARCH_MAX_RESULTS: int = Field(5, description="web_search 默认返回的来源数")
+    SEARCH_MAX_CHARS: int = Field(2000, description="web_search 默认返回内容的总字符预算")
+    SEARCH_TIMEOUT: float = Field(30.0, description="web_search 单次上游请求超时（秒）")
+    SEARCH_HEDGE: bool = Field(False, description="web_search 是否启用对冲请求")
+    SEARCH_HEDGE_PERCENTILE: float = Field(95.0, description="对冲阈值取最近请求耗时的分位数")
+    SEARCH_HEDGE_BUDGET: float = Field(0.1, description="对冲额外请求占总请求数的比例上限")
+    SEARCH_HEDGE_WINDOW: int = Field(200, description="计算对冲阈值的滚动样本数")
+    SEARCH_HEDGE_MIN_SAMPLES: int = Field(20, description="样本数达到该值后才开始对冲")
+    SEMANTIC_CACHE_SIZE: int = Field(512, description="web_search 近似查询索引容量，0 表示关闭")
+    SEMANTIC_CACHE_THRESHOLD: float = Field(0.85, description="近似查询命中的余弦相似度阈值")
+    SEMANTIC_CACHE_TTL: float = Field(300.0, description="近似查询索引条目有效期（秒）")
+    SEMANTIC_CACHE_STRICT: bool = Field(True, description="命中时是否要求内容词序列（含顺序）一致")
 
     class Config:
         env_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_admission.py
+@Time    :   2025/10/10 17:36:48
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   准入控制：单客户端上限、受信任客户端、队列截止时间与取消后的名额归还
+'''
+
+import asyncio
+import unittest
+
+from common.admission import Overloaded, _Lane
+
+
+class LaneTest(unittest.IsolatedAsyncioTestCase):
+
+    def lane(self, **kwargs) -> _Lane:
+        conf = {"max_in_flight": 8, "max_queue": 8, "client_max_in_flight": 2, "timeout": 0.05, **kwargs}
+        return _Lane("test", **conf)
+
+    async def test_per_client_limit_rejects_fast(self):
+        lane = self.lane()
+        for _ in range(2):
+            await lane.acquire("a")
+        waiting = [asyncio.create_task(lane.acquire("a")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with self.assertRaises(Overloaded) as caught:
+            await lane.acquire("a")
+        self.assertIn("per-client", str(caught.exception))
+        self.assertGreater(caught.exception.retry_after, 0)
+        # 其他客户端不受影响
+        await lane.acquire("b")
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+    async def test_trusted_client_only_bound_by_lane_limit(self):
+        lane = self.lane()
+        for _ in range(8):
+            await lane.acquire("chat", trusted=True)
+        self.assertEqual(lane.in_flight, 8)
+        with self.assertRaises(Overloaded):
+            await lane.acquire("chat", trusted=True)
+
+    async def test_queue_deadline_and_release(self):
+        lane = self.lane(max_in_flight=1)
+        await lane.acquire("a")
+        with self.assertRaises(Overloaded) as caught:
+            await lane.acquire("b")
+        self.assertIn("deadline", str(caught.exception))
+        self.assertEqual(lane.stats()["queued"], 0)
+
+        waiter = asyncio.create_task(lane.acquire("b"))
+        await asyncio.sleep(0)
+        lane.release("a", 0.01)
+        await waiter
+        self.assertEqual(lane.in_flight, 1)
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        lane = self.lane(max_in_flight=1, timeout=5)
+        await lane.acquire("a")
+        waiter = asyncio.create_task(lane.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(lane.stats()["queued"], 0)
+        lane.release("a", 0.01)
+        self.assertEqual(lane.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_cache.py
+@Time    :   2025/10/11 09:48:05
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   结果缓存：TTL 过期、LRU 容量与并发请求合并为一次加载
+'''
+
+import asyncio
+import unittest
+from unittest import mock
+
+from common.cache import AsyncTTLCache
+
+
+class AsyncTTLCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_ttl_expiry(self):
+        cache = AsyncTTLCache(ttl=10, maxsize=4)
+        with mock.patch("common.cache.time.monotonic", return_value=100.0):
+            cache.set("k", "v")
+            self.assertEqual(cache.get("k"), "v")
+        with mock.patch("common.cache.time.monotonic", return_value=109.9):
+            self.assertEqual(cache.get("k"), "v")
+        with mock.patch("common.cache.time.monotonic", return_value=110.0):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    async def test_lru_evicts_oldest(self):
+        cache = AsyncTTLCache(ttl=10, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+
+    async def test_single_flight(self):
+        cache = AsyncTTLCache(ttl=10, maxsize=4)
+        calls = 0
+        release = asyncio.Event()
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "v"
+
+        tasks = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await asyncio.gather(*tasks), ["v"] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual(await cache.get_or_load("k", loader), "v")
+        stats = cache.stats()
+        self.assertEqual((stats["misses"], stats["coalesced"], stats["hits"]), (1, 4, 1))
+
+    async def test_cancelled_waiter_does_not_cancel_load(self):
+        cache = AsyncTTLCache(ttl=10, maxsize=4)
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "v"
+
+        first = asyncio.create_task(cache.get_or_load("k", loader))
+        second = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        self.assertEqual(await second, "v")
+        self.assertEqual(cache.get("k"), "v")
+
+    async def test_failed_load_is_not_cached(self):
+        cache = AsyncTTLCache(ttl=10, maxsize=4)
+
+        async def failing():
+            raise RuntimeError("upstream down")
+
+        with self.assertRaises(RuntimeError):
+            await cache.get_or_load("k", failing)
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["inflight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_executor.py
+@Time    :   2025/10/10 15:21:06
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   工具执行策略：默认值只作用于线程/进程池，超时后名额在任务结束时才归还
+'''
+
+import asyncio
+import threading
+import unittest
+
+from common.executor import ToolExecutor, ToolPolicy, resolve_policy
+
+
+class ResolvePolicyTest(unittest.TestCase):
+
+    def test_async_tools_default_to_unbounded_inline(self):
+        self.assertEqual(resolve_policy("some_async_tool", True), ToolPolicy("inline", 0, 0.0))
+
+    def test_sync_tools_get_pool_defaults(self):
+        policy = resolve_policy("some_sync_tool", False)
+        self.assertIn(policy.mode, ("thread", "process"))
+        self.assertGreater(policy.concurrency, 0)
+
+
+class ToolExecutorTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_timed_out_thread_call_keeps_slot_until_done(self):
+        executor = ToolExecutor()
+        release = threading.Event()
+
+        def blocking():
+            release.wait(5)
+            return "done"
+
+        run = executor.wrap("blocking", blocking, False, ToolPolicy("thread", 1, 0.05))
+        with self.assertRaises(TimeoutError):
+            await run()
+        self.assertEqual(executor.stats()["blocking"]["running"], 1)
+
+        release.set()
+        for _ in range(100):
+            if executor.stats()["blocking"]["running"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(executor.stats()["blocking"]["running"], 0)
+        self.assertEqual(await run(), "done")
+
+    async def test_inline_async_tool_is_not_capped(self):
+        executor = ToolExecutor()
+        active = peak = 0
+
+        async def io_tool():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        run = executor.wrap("io_tool", io_tool, True, resolve_policy("io_tool", True))
+        await asyncio.gather(*(run() for _ in range(50)))
+        self.assertEqual(peak, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_hedge.py
+@Time    :   2025/10/10 11:02:37
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   对冲请求：补发胜出后被取消的一方应归还限流配额
+'''
+
+import asyncio
+import unittest
+
+from common.hedge import Hedger
+from common.limiter import AdaptiveLimiter
+
+
+class HedgeReleaseTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.limiter = AdaptiveLimiter()
+        # 测试只关心并发窗口，放开令牌桶速率
+        self.limiter.bucket("k").rate = 1000
+        self.hedger = Hedger(enabled=True, percentile=50, budget=1.0, window=10, min_samples=5)
+        for _ in range(5):
+            await self.hedger.run(self._fast)
+
+    async def _fast(self):
+        return await self.limiter.run("k", lambda: asyncio.sleep(0.001, "fast"), timeout=1)
+
+    async def test_hedged_win_releases_loser_slot(self):
+        calls = 0
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            # 第一次请求卡住，补发的请求很快返回
+            return await asyncio.sleep(10 if calls == 1 else 0, "slow" if calls == 1 else "fast")
+
+        result = await self.hedger.run(lambda: self.limiter.run("k", upstream))
+        self.assertEqual(result, "fast")
+        self.assertEqual(self.hedger.hedge_wins, 1)
+        self.assertEqual(self.limiter.bucket("k").in_flight, 0)
+
+    async def test_repeated_hedges_do_not_exhaust_window(self):
+        window = int(self.limiter.bucket("k").window)
+        for _ in range(window * 2):
+            slow = True
+
+            async def upstream():
+                nonlocal slow
+                if slow:
+                    slow = False
+                    await asyncio.sleep(10)
+                return "ok"
+
+            self.assertEqual(await self.hedger.run(lambda: self.limiter.run("k", upstream, timeout=1)), "ok")
+        self.assertEqual(self.limiter.bucket("k").in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_history.py
+@Time    :   2025/10/11 10:15:42
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   对话历史：预算边界上的压缩、tool_calls 与回复成组丢弃、未完成轮次的回滚
+'''
+
+import os
+import sys
+import unittest
+
+# 客户端模块按 clients/ 为根导入；追加到末尾，避免 clients/setting.py 遮住服务端 setting
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "clients"))
+
+from history import ConversationHistory, message_tokens  # noqa: E402
+
+
+def turn(i: int, result: str = "r" * 40):
+    call = {"id": f"c{i}", "type": "function", "function": {"name": "web_search", "arguments": "{}"}}
+    return [
+        {"role": "user", "content": f"q{i}"},
+        {"role": "assistant", "content": None, "tool_calls": [call]},
+        {"role": "tool", "tool_call_id": f"c{i}", "content": result},
+        {"role": "assistant", "content": f"a{i}"},
+    ]
+
+
+def tokens(msgs) -> int:
+    return sum(message_tokens(m) for m in msgs)
+
+
+class ConversationHistoryTest(unittest.TestCase):
+
+    def test_exactly_at_budget_is_kept(self):
+        msgs = turn(1) + turn(2) + turn(3)
+        history = ConversationHistory(budget=tokens(msgs), keep_turns=1)
+        history.extend(msgs)
+        self.assertEqual(list(history), msgs)
+        self.assertEqual(history.total_tokens, tokens(msgs))
+
+    def test_one_over_budget_truncates_old_tool_results_first(self):
+        msgs = turn(1, "x" * 400) + turn(2)
+        history = ConversationHistory(budget=tokens(msgs) - 1, keep_turns=1, tool_snippet=20)
+        history.extend(msgs)
+        self.assertEqual(len(history), len(msgs))
+        self.assertTrue(history[2]["content"].startswith("x" * 20 + "...[truncated 380 chars]"))
+        self.assertEqual(history.total_tokens, tokens(history))
+        self.assertLessEqual(history.total_tokens, history.budget)
+
+    def test_drops_whole_oldest_turns(self):
+        msgs = turn(1) + turn(2) + turn(3)
+        history = ConversationHistory(budget=tokens(turn(2) + turn(3)), keep_turns=1, tool_snippet=1000)
+        history.extend(msgs)
+        self.assertEqual(list(history), turn(2) + turn(3))
+        # 不会留下缺少 tool_calls 的孤立 tool 回复
+        self.assertEqual(history[0]["role"], "user")
+        self.assertEqual(history.total_tokens, tokens(history))
+
+    def test_pinned_turns_survive_over_budget(self):
+        msgs = turn(1) + turn(2)
+        history = ConversationHistory(budget=1, keep_turns=1, tool_snippet=1000)
+        history.extend(msgs)
+        self.assertEqual(list(history), turn(2))
+
+    def test_rollback_removes_partial_turn(self):
+        history = ConversationHistory(budget=10_000)
+        history.extend(turn(1))
+        before = history.total_tokens
+        user = {"role": "user", "content": "q2"}
+        history.append(user)
+        history.append(turn(2)[1])
+        history.rollback(user)
+        self.assertEqual(list(history), turn(1))
+        self.assertEqual(history.total_tokens, before)
+
+    def test_rollback_after_compaction(self):
+        history = ConversationHistory(budget=tokens(turn(2) + turn(3)), keep_turns=1, tool_snippet=1000)
+        history.extend(turn(1) + turn(2))
+        user = turn(3)[0]
+        history.append(user)
+        history.extend(turn(3)[1:])
+        history.rollback(user)
+        self.assertEqual(history[-1], turn(2)[-1])
+        self.assertEqual(history.total_tokens, tokens(history))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_image_store.py
+@Time    :   2025/10/11 16:32:09
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   图片镜像：LRU 淘汰同时清理链接记录、空文件读取、线程池并发读取
+'''
+
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import httpx
+
+from common.image_store import URI_PREFIX, ImageStore
+from common.upstream import upstream
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    # 每个链接返回不同内容，路径即内容
+    body = request.url.path.encode() * 100
+    return httpx.Response(200, content=body, headers={"content-type": "image/png"})
+
+
+class ImageStoreTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        patcher = mock.patch.object(upstream, "_async_client", self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        self.tmp.cleanup()
+
+    async def test_eviction_drops_url_entries(self):
+        store = ImageStore(self.tmp.name, max_bytes=1000)
+        uris = [await store.mirror(f"https://img.example/{i:04d}") for i in range(5)]
+        stats = store.stats()
+        self.assertLessEqual(stats["bytes"], 1000)
+        self.assertEqual(stats["urls"], stats["files"])
+        self.assertGreater(stats["evicted"], 0)
+        # 最新的仍可复用，最早的已被淘汰需重新下载
+        self.assertEqual(await store.mirror("https://img.example/0004"), uris[-1])
+        self.assertEqual(store.reused, 1)
+        await store.mirror("https://img.example/0000")
+        self.assertEqual(store.downloads, 6)
+
+    async def test_empty_file(self):
+        store = ImageStore(self.tmp.name, max_bytes=1000)
+        name = "0" * 64 + ".png"
+        os.makedirs(os.path.dirname(store.path(name)))
+        open(store.path(name), "wb").close()
+        with store.open(name) as mm:
+            self.assertEqual(mm[:], b"")
+        self.assertEqual(list(store.iter_range(name)), [])
+
+    async def test_concurrent_reads_from_threads(self):
+        store = ImageStore(self.tmp.name, max_bytes=10 ** 6, chunk_size=64)
+        names = [(await store.mirror(f"https://img.example/{i:04d}"))[len(URI_PREFIX):] for i in range(8)]
+
+        def read(i: int) -> int:
+            name = names[i % len(names)]
+            return sum(len(chunk) for chunk in store.iter_range(name))
+
+        with ThreadPoolExecutor(8) as pool:
+            sizes = list(pool.map(read, range(400)))
+        self.assertEqual(set(sizes), {500})
+        self.assertEqual(store.stats()["files"], 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
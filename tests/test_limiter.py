@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_limiter.py
+@Time    :   2025/10/10 10:14:52
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   上游限流器：取消、异常与 429 重排队后配额都应归还，429 重排队前先退避
+
+    python -m unittest discover tests
+'''
+
+import asyncio
+import unittest
+from typing import Optional
+from unittest import mock
+
+from common.limiter import AdaptiveLimiter
+from setting import settings
+
+
+class _Status(Exception):
+    def __init__(self, status_code: int, headers: Optional[dict] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class LimiterReleaseTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.limiter = AdaptiveLimiter()
+
+    async def test_cancelled_run_releases_slot(self):
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(self.limiter.run("k", slow))
+        await started.wait()
+        self.assertEqual(self.limiter.bucket("k").in_flight, 1)
+        window = self.limiter.bucket("k").window
+
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.limiter.bucket("k").in_flight, 0)
+        # 取消不是上游过载，不应收缩窗口
+        self.assertEqual(self.limiter.bucket("k").window, window)
+
+    async def test_cancelled_slot_releases(self):
+        entered = asyncio.Event()
+
+        async def stream():
+            async with self.limiter.slot("k"):
+                entered.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(stream())
+        await entered.wait()
+        window = self.limiter.bucket("k").window
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.limiter.bucket("k").in_flight, 0)
+        self.assertEqual(self.limiter.bucket("k").window, window)
+
+    async def test_error_releases_and_shrinks_window(self):
+        async def failing():
+            raise _Status(500)
+
+        window = self.limiter.bucket("k").window
+        with self.assertRaises(_Status):
+            await self.limiter.run("k", failing)
+        self.assertEqual(self.limiter.bucket("k").in_flight, 0)
+        self.assertLess(self.limiter.bucket("k").window, window)
+
+    async def test_429_requeues_then_succeeds(self):
+        loop = asyncio.get_running_loop()
+        calls = []
+
+        async def flaky():
+            calls.append(loop.time())
+            if len(calls) < 3:
+                raise _Status(429)
+            return "ok"
+
+        rate = self.limiter.bucket("k").rate
+        with mock.patch.object(settings, "LIMIT_RETRY_BACKOFF", 0.1):
+            self.assertEqual(await self.limiter.run("k", flaky), "ok")
+        self.assertEqual(len(calls), 3)
+        # 等量抖动的指数退避：第一次 [0.05, 0.1)，第二次 [0.1, 0.2)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.05)
+        self.assertGreaterEqual(calls[2] - calls[1], 0.1)
+        self.assertEqual(self.limiter.bucket("k").in_flight, 0)
+        # 两次 429 各把速率减半，随后的成功只恢复一小步
+        self.assertLess(self.limiter.bucket("k").rate, rate * settings.LIMIT_DECREASE)
+
+    async def test_429_honours_retry_after(self):
+        loop = asyncio.get_running_loop()
+        calls = []
+
+        async def flaky():
+            calls.append(loop.time())
+            if len(calls) == 1:
+                raise _Status(429, {"retry-after": "0.3"})
+            return "ok"
+
+        self.assertEqual(await self.limiter.run("k", flaky), "ok")
+        self.assertGreaterEqual(calls[1] - calls[0], 0.3)
+
+    async def test_retry_after_beyond_deadline_fails_fast(self):
+        calls = 0
+
+        async def limited():
+            nonlocal calls
+            calls += 1
+            raise _Status(429, {"retry-after": "60"})
+
+        with self.assertRaises(_Status):
+            await self.limiter.run("k", limited, timeout=1)
+        self.assertEqual(calls, 1)
+        self.assertEqual(self.limiter.bucket("k").in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_math.py
+@Time    :   2025/10/11 14:06:51
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   数学工具：表达式求值、参数个数与规模校验、非有限结果报错
+'''
+
+import unittest
+from unittest import mock
+
+from setting import settings
+from tools import math_tool
+
+
+class _App:
+    '''
+    @desc     : 只收集工具函数的 FastMCP 替身
+    '''
+
+    def __init__(self):
+        self.tools = {}
+
+    def tool(self, *args, **kwargs):
+        def decorator(fn):
+            self.tools[fn.__name__] = fn
+            return fn
+        return decorator
+
+
+class MathToolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        app = _App()
+        math_tool.register(app)
+        cls.tools = app.tools
+
+    def evaluate(self, expression: str, **variables):
+        return self.tools["evaluate"](expression=expression, variables=variables)
+
+    def assertRejected(self, pattern: str, fn, *args, **kwargs):
+        with self.assertRaisesRegex(ValueError, pattern):
+            fn(*args, **kwargs)
+
+    def test_evaluate(self):
+        self.assertEqual(self.evaluate("sum(price * qty) / sum(qty)", price=[10, 20], qty=[1, 3]), 17.5)
+        self.assertEqual(self.evaluate("round(x / 3, 2)", x=[1, 2]), [0.33, 0.67])
+        self.assertEqual(self.evaluate("percentile(x, 50)", x=[1, 2, 3]), 2.0)
+        self.assertEqual(self.evaluate("-x ** 2 + [1, 1]", x=[1, 2]), [0.0, -3.0])
+
+    def test_non_finite_results_name_positions(self):
+        self.assertRejected(r"not finite \(inf\)", self.evaluate, "1/0")
+        self.assertRejected(r"1 position\(s\) \[1\]", self.evaluate, "x / y", x=[1, 2, 3], y=[1, 0, 2])
+        self.assertRejected(r"\[0, 2\]", self.evaluate, "sqrt(x)", x=[-1, 4, -9])
+        self.assertRejected(r"\[1\]", self.tools["batch_elementwise"], op="divide", a=[1, 2], b=[1, 0])
+        self.assertRejected("not finite", self.tools["batch_reduce"], op="sum", values=[1e308, 1e308])
+        self.assertRejected("not finite", self.tools["dot"], a=[1e200], b=[1e200])
+
+    def test_function_arity(self):
+        self.assertRejected(r"max\(\) takes 1 argument", self.evaluate, "max(x, 0)", x=[1, 2])
+        self.assertRejected(r"abs\(\) takes 1 argument", self.evaluate, "abs(x, y)", x=[1], y=[2])
+        self.assertRejected(r"round\(\) takes 1 to 2", self.evaluate, "round(x, 1, 2)", x=[1])
+        self.assertRejected(r"percentile\(\) takes 2", self.evaluate, "percentile(x)", x=[1])
+        self.assertRejected(r"sum\(\) takes 1", self.evaluate, "sum()")
+
+    def test_only_flat_operands(self):
+        self.assertRejected("flat list", self.evaluate, "[x, x]", x=[1, 2])
+        self.assertRejected("flat list", self.evaluate, "[[1, 2], [3, 4]]")
+        self.assertRejected("do not match", self.evaluate, "x + y", x=[1, 2], y=[1, 2, 3])
+        self.assertRejected("do not match", self.evaluate, "dot(x, y)", x=[1, 2], y=[1, 2, 3])
+
+    def test_size_limit(self):
+        with mock.patch.object(settings, "MATH_MAX_ITEMS", 4):
+            self.assertEqual(self.evaluate("x * 2", x=[1, 2, 3, 4]), [2.0, 4.0, 6.0, 8.0])
+            self.assertRejected("limit is 4", self.evaluate, "x * 2", x=[1, 2, 3, 4, 5])
+            self.assertRejected("limit is 4", self.evaluate, "[1, 2, 3, 4, 5]")
+            self.assertRejected("limit is 4", self.evaluate, "percentile(x, [1, 2, 3, 4, 5])", x=[1])
+
+    def test_unsupported_syntax(self):
+        self.assertRejected("unsupported", self.evaluate, "__import__('os')")
+        self.assertRejected("unsupported", self.evaluate, "sum(x, axis=0)", x=[1])
+        self.assertRejected("unknown variable", self.evaluate, "y + 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
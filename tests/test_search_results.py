@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_search_results.py
+@Time    :   2025/10/11 11:02:18
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   搜索结果：来源解析、预算内截断、去重，以及 web_search 的错误码
+'''
+
+import unittest
+from unittest import mock
+
+import httpx
+
+from common.limiter import UpstreamBusy
+from common.search_results import SOURCE_OVERHEAD, parse_sources, select_snippets
+from tools import web_search
+
+RESPONSE = {
+    "choices": [{
+        "message": {
+            "content": "",
+            "tool_calls": [{"search_result": [
+                {"title": "北京天气", "link": "https://a.example", "content": "北京今天晴，气温 18 到 26 度。北京明天有小雨。广告：点击下载应用。"},
+                {"title": "上海天气", "link": "https://b.example", "content": "上海今天多云。"},
+                {"title": "转载", "link": "https://c.example", "content": "北京今天晴，气温 18 到 26 度。"},
+            ]}],
+        },
+    }],
+}
+
+
+class _App:
+    '''
+    @desc     : 只收集工具函数的 FastMCP 替身
+    '''
+
+    def __init__(self):
+        self.tools = {}
+
+    def tool(self, *args, **kwargs):
+        def decorator(fn):
+            self.tools[fn.__name__] = fn
+            return fn
+        return decorator
+
+    def resource(self, *args, **kwargs):
+        return lambda fn: fn
+
+
+class SelectSnippetsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sources = parse_sources(RESPONSE)
+
+    def test_parse_sources(self):
+        self.assertEqual([s["url"] for s in self.sources], ["https://a.example", "https://b.example", "https://c.example"])
+        fallback = parse_sources({"choices": [{"message": {"content": "只有正文"}}]})
+        self.assertEqual(fallback, [{"title": "", "url": "", "content": "只有正文"}])
+
+    def test_relevant_first_and_duplicates_dropped(self):
+        picked = select_snippets("北京 天气", self.sources)
+        self.assertEqual(picked[0]["url"], "https://a.example")
+        self.assertIn("北京今天晴", picked[0]["snippet"])
+        self.assertNotIn("广告", picked[0]["snippet"])
+        # 转载来源的句子与第一个来源重复，整个来源没有可用句子
+        self.assertNotIn("https://c.example", [p["url"] for p in picked])
+
+    def test_char_budget_truncates_first_sentence(self):
+        source = self.sources[0]
+        budget = SOURCE_OVERHEAD + len(source["title"]) + len(source["url"]) + 6
+        picked = select_snippets("北京 天气", self.sources, max_results=1, max_chars=budget)
+        self.assertEqual(len(picked), 1)
+        snippet = picked[0]["snippet"]
+        self.assertTrue(snippet.endswith("…"))
+        self.assertLessEqual(len(snippet), 6)
+
+    def test_budget_smaller_than_overhead_returns_nothing(self):
+        self.assertEqual(select_snippets("北京", self.sources, max_chars=SOURCE_OVERHEAD), [])
+
+    def test_token_budget(self):
+        loose = select_snippets("北京 天气", self.sources, max_chars=10_000)
+        tight = select_snippets("北京 天气", self.sources, max_chars=10_000, max_tokens=20)
+        self.assertLess(sum(len(p["snippet"]) for p in tight), sum(len(p["snippet"]) for p in loose))
+        self.assertTrue(tight[-1]["snippet"].endswith("…"))
+
+    def test_max_results(self):
+        self.assertEqual(len(select_snippets("天气", self.sources, max_results=1)), 1)
+
+
+class WebSearchErrorTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        app = _App()
+        web_search.register(app)
+        self.web_search = app.tools["web_search"]
+
+    async def call(self, query: str, error: Exception) -> dict:
+        with mock.patch.object(web_search, "_search", mock.AsyncMock(side_effect=error)):
+            return await self.web_search(query=query)
+
+    async def test_error_codes(self):
+        request = httpx.Request("POST", "https://bigmodel.example/tools")
+        cases = [
+            (web_search.SearchHTTPError(429, "rate limited"), {"error": "upstream_http_429"}),
+            (UpstreamBusy("tools:web-search-pro", 2.4), {"error": "upstream_busy", "retry_after": 2}),
+            (httpx.ReadTimeout("timeout", request=request), {"error": "upstream_timeout"}),
+            (httpx.ConnectError("refused", request=request), {"error": "upstream_unreachable"}),
+            (ValueError("not json"), {"error": "bad_response"}),
+            (RuntimeError("boom"), {"error": "internal_error"}),
+        ]
+        for i, (error, expected) in enumerate(cases):
+            with self.subTest(error=type(error).__name__):
+                self.assertEqual(await self.call(f"error case {i}", error), expected)
+
+    async def test_errors_are_not_cached(self):
+        query = "error then success"
+        await self.call(query, web_search.SearchHTTPError(503, "busy"))
+        with mock.patch.object(web_search, "_search", mock.AsyncMock(return_value={"sources": parse_sources(RESPONSE)})):
+            result = await self.web_search(query=query)
+        self.assertEqual(result["query"], query)
+        self.assertTrue(result["sources"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_semantic_cache.py
+@Time    :   2025/10/11 11:40:26
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   近似查询缓存：strict 模式只放过虚词、空白与标点的差异，词序颠倒或改写的查询不命中
+'''
+
+import unittest
+
+from common.semantic_cache import SemanticCache
+
+
+class SemanticCacheTest(unittest.TestCase):
+
+    def cache(self, strict: bool = True) -> SemanticCache:
+        return SemanticCache(capacity=16, threshold=0.85, ttl=60, strict=strict)
+
+    def test_equivalent_queries_hit(self):
+        cache = self.cache()
+        cache.add("北京天气", "bj")
+        cache.add("weather in Paris", "paris")
+        self.assertEqual(cache.get("北京的天气"), "bj")
+        self.assertEqual(cache.get("北京 天气？"), "bj")
+        self.assertEqual(cache.get("The weather of PARIS"), "paris")
+
+    def test_reversed_queries_miss(self):
+        cache = self.cache()
+        for query in ("上海到北京", "鱼吃猫", "eur to usd"):
+            cache.add(query, query)
+        for query in ("北京到上海", "猫吃鱼", "usd to eur"):
+            with self.subTest(query=query):
+                self.assertIsNone(cache.get(query))
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_paraphrased_queries_miss(self):
+        cache = self.cache()
+        cache.add("今天北京天气", "today")
+        cache.add("北京天气预报", "forecast")
+        for query in ("明天北京天气", "北京今天天气", "北京天气"):
+            with self.subTest(query=query):
+                self.assertIsNone(cache.get(query))
+
+    def test_non_strict_uses_similarity_only(self):
+        cache = self.cache(strict=False)
+        cache.add("上海到北京", "route")
+        self.assertEqual(cache.get("上海到北京。"), "route")
+        self.assertIsNone(cache.get("广州天气"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+'''
+@File    :   test_stream_json.py
+@Time    :   2025/10/11 09:21:37
+@Author  :   SeeStars
+@Version :   1.0
+@Desc    :   流式场景解析：对象在任意位置被切开时都应在闭合后完整产出
+'''
+
+import json
+import unittest
+
+from common.stream_json import SceneStreamParser
+
+SCENES = [
+    {"scene": "第一幕", "image_prompt": "A boy {with} a \"red\" kite"},
+    {"scene": "第二幕", "image_prompt": "rain\\n [over] the city"},
+]
+TEXT = "```json\n" + json.dumps({"list": SCENES}, ensure_ascii=False) + "\n```"
+
+
+class SceneStreamParserTest(unittest.TestCase):
+
+    def test_every_split_point(self):
+        for cut in range(len(TEXT) + 1):
+            parser = SceneStreamParser()
+            scenes = parser.feed(TEXT[:cut]) + parser.feed(TEXT[cut:])
+            self.assertEqual(scenes, SCENES, f"cut at {cut}")
+            self.assertEqual(parser.result(scenes), {"list": SCENES})
+
+    def test_char_by_char_yields_scene_when_closed(self):
+        parser = SceneStreamParser()
+        first_end = TEXT.index("\"}") + 2
+        produced = []
+        for i, ch in enumerate(TEXT):
+            items = parser.feed(ch)
+            if items:
+                produced.append((i, items))
+        self.assertEqual([items for _, items in produced], [[SCENES[0]], [SCENES[1]]])
+        self.assertEqual(produced[0][0], first_end - 1)
+
+    def test_truncated_stream_falls_back_to_parsed_scenes(self):
+        parser = SceneStreamParser()
+        cut = TEXT.index("第二幕")
+        scenes = parser.feed(TEXT[:cut])
+        self.assertEqual(scenes, SCENES[:1])
+        self.assertEqual(parser.result(scenes), {"list": SCENES[:1]})
+
+
+if __name__ == "__main__":
+    unittest.main()
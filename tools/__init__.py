@@ -7,11 +7,18 @@
 @Version :   1.0
 @Desc    :   None
 """
+import logging
 from mcp.server import FastMCP
+from common.admission import admission, lane_of
+from common.executor import executor, resolve_policy
+from common.metrics import metrics
+from setting import settings
 from . import web_search
 from . import math_tool
 from . import story_tool
 
+logger = logging.getLogger(__name__)
+
 
 def register_tools(app: FastMCP):
     """
@@ -21,3 +28,41 @@ def register_tools(app: FastMCP):
     web_search.register(app)
     math_tool.register(app)
     story_tool.register(app)
+    apply_policies(app)
+    if settings.ADMISSION_CONTROL:
+        apply_admission(app)
+    instrument_tools(app)
+
+
+def apply_policies(app: FastMCP):
+    """
+    @desc     : 按 TOOL_POLICIES 为每个工具选择执行方式（inline / thread / process）及并发上限、超时，
+                包装后的工具一律是协程，同步工具不再占用事件循环线程
+    @param    : app (FastMCP): FastMCP 应用实例
+    """
+    for tool in app._tool_manager.list_tools():
+        policy = resolve_policy(tool.name, tool.is_async)
+        if policy.mode == "process" and tool.context_kwarg:
+            # Context 无法跨进程传递
+            logger.warning(f"tool {tool.name} takes a Context, running it in the thread pool instead of a process")
+            policy.mode = "thread"
+        tool.fn = executor.wrap(tool.name, tool.fn, tool.is_async, policy, module=tool.fn.__module__)
+        tool.is_async = True
+
+
+def apply_admission(app: FastMCP):
+    """
+    @desc     : 在执行策略之外再包一层准入控制，按工具所属分道排队或快速拒绝（须在 apply_policies 之后调用）
+    @param    : app (FastMCP): FastMCP 应用实例
+    """
+    for tool in app._tool_manager.list_tools():
+        tool.fn = admission.wrap(tool.fn, lane_of(tool.name, tool.annotations))
+
+
+def instrument_tools(app: FastMCP):
+    """
+    @desc     : 为已注册的工具包装指标采集（参数校验元数据已在注册时生成，不受影响）
+    @param    : app (FastMCP): FastMCP 应用实例
+    """
+    for tool in app._tool_manager.list_tools():
+        tool.fn = metrics.wrap(tool.name, tool.fn, tool.is_async)
@@ -7,17 +7,191 @@
 @Version :   1.0
 @Desc    :   None
 '''
+import ast
 import logging
+import math
 import traceback
-import httpx
+from common.lazy import lazy_import
+from common.types import PURE_TOOL
 from setting import settings
+from typing import List, Literal, Optional
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# numpy 推迟到批量工具首次调用时再导入
+np = lazy_import("numpy")
+
+ElementwiseOp = Literal["add", "subtract", "multiply", "divide"]
+ReduceOp = Literal["sum", "mean", "min", "max", "median", "std", "percentile"]
+
+
+def _as_array(values, name: str) -> "np.ndarray":
+    """
+    @desc     : 转为 float64 数组并检查维度与长度上限，只接受数字或一维数组
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim > 1:
+        raise ValueError(f"{name} must be a number or a flat list of numbers")
+    if arr.size > settings.MATH_MAX_ITEMS:
+        raise ValueError(f"{name} has {arr.size} items, limit is {settings.MATH_MAX_ITEMS}")
+    return arr
+
+
+def _safe_divide(a, b):
+    """
+    @desc     : 除数为 0 时结果为 inf，由 _to_result 报错
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    out = np.full(a.shape, np.inf)
+    np.divide(a, b, out=out, where=b != 0)
+    return out
+
+
+# 下列表只保存函数名，调用时经 _fn 解析，导入本模块不会触发 numpy 加载
+_ELEMENTWISE = {
+    "add": "add",
+    "subtract": "subtract",
+    "multiply": "multiply",
+    "divide": "safe_divide",
+}
+
+_REDUCE = {
+    "sum": "sum",
+    "mean": "mean",
+    "min": "min",
+    "max": "max",
+    "median": "median",
+    "std": "std",
+}
+
+_BIN_OPS = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "safe_divide",
+    ast.Pow: "power",
+}
+
+_FUNCTIONS = {
+    **_REDUCE,
+    "abs": "abs",
+    "sqrt": "sqrt",
+    "round": "round",
+    "dot": "dot",
+    "percentile": "percentile",
+}
+
+
+# 白名单函数可接受的位置参数个数（最少, 最多），如 max(x, 0) 在 numpy 中是 axis 参数、abs(x, y) 是 out 参数，必须拒绝
+_ARITY = {
+    **{name: (1, 1) for name in _REDUCE},
+    "abs": (1, 1),
+    "sqrt": (1, 1),
+    "round": (1, 2),
+    "dot": (2, 2),
+    "percentile": (2, 2),
+}
+
+
+def _fn(name: str):
+    if name == "safe_divide":
+        return _safe_divide
+    return getattr(np, name)
+
+
+def _as_decimals(value) -> int:
+    """
+    @desc     : round 的小数位数参数：数字字面量都被求值为 float64，这里转回 int
+    """
+    if np.ndim(value) or float(value) != int(value):
+        raise ValueError("round decimals must be an integer")
+    return int(value)
+
+
+def _check_broadcast(name: str, *operands) -> None:
+    """
+    @desc     : 运算前按广播后的形状检查结果规模，只允许标量与一维数组，元素数不超过 MATH_MAX_ITEMS
+    """
+    try:
+        shape = np.broadcast_shapes(*(np.shape(x) for x in operands))
+    except ValueError:
+        raise ValueError(f"{name}: operand lengths {[int(np.size(x)) for x in operands]} do not match") from None
+    if len(shape) > 1:
+        raise ValueError(f"{name}: only numbers and flat lists are supported")
+    if math.prod(shape) > settings.MATH_MAX_ITEMS:
+        raise ValueError(f"{name}: result has {math.prod(shape)} items, limit is {settings.MATH_MAX_ITEMS}")
+
+
+def _call(name: str, args: list):
+    """
+    @desc     : 校验参数个数与规模后调用白名单函数
+    """
+    low, high = _ARITY[name]
+    if not low <= len(args) <= high:
+        expected = low if low == high else f"{low} to {high}"
+        raise ValueError(f"{name}() takes {expected} argument(s), got {len(args)}")
+    if name in ("abs", "sqrt", "dot"):
+        _check_broadcast(name, *args)
+    elif name == "round":
+        _check_broadcast(name, args[0])
+        if len(args) == 2:
+            args[1] = _as_decimals(args[1])
+    elif name == "percentile":
+        _check_broadcast(name, args[1])
+    return _fn(_FUNCTIONS[name])(*args)
+
+
+def _eval_node(node: ast.AST, variables: dict):
+    """
+    @desc     : 只允许数字、变量、四则运算/乘方与白名单函数的表达式求值
+    """
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body, variables)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return np.float64(node.value)
+    if isinstance(node, ast.Name):
+        if node.id not in variables:
+            raise ValueError(f"unknown variable: {node.id}")
+        return variables[node.id]
+    if isinstance(node, ast.List):
+        return _as_array([_eval_node(e, variables) for e in node.elts], "list")
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        value = _eval_node(node.operand, variables)
+        return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        left, right = _eval_node(node.left, variables), _eval_node(node.right, variables)
+        _check_broadcast(ast.unparse(node)[:60], left, right)
+        return _fn(_BIN_OPS[type(node.op)])(left, right)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS and not node.keywords:
+        return _call(node.func.id, [_eval_node(a, variables) for a in node.args])
+    raise ValueError(f"unsupported expression element: {ast.dump(node)[:80]}")
+
+
+def _to_result(value):
+    """
+    @desc     : 转为 JSON 可表示的结果。inf / nan 在文本与结构化输出中都无法如实表示，
+                出现时报错并指出位置（最多列出 10 个），而不是返回被丢弃或错位的 null
+    """
+    if isinstance(value, np.ndarray) and value.ndim:
+        bad = np.flatnonzero(~np.isfinite(value))
+        if bad.size:
+            shown = ", ".join(str(i) for i in bad[:10]) + (", ..." if bad.size > 10 else "")
+            raise ValueError(
+                f"result is not finite at {bad.size} position(s) [{shown}] "
+                "(division by zero, overflow or invalid operation such as sqrt of a negative number)"
+            )
+        return value.tolist()
+    value = float(value)
+    if not np.isfinite(value):
+        raise ValueError(
+            f"result is not finite ({value}): division by zero, overflow or invalid operation such as sqrt of a negative number"
+        )
+    return value
+
 
 def register(app):
-    @app.tool()
+    @app.tool(annotations=PURE_TOOL)
     def add(a: float, b: float) -> float:
         '''
         @desc     : Adds two numbers.
@@ -27,7 +201,7 @@ def register(app):
         '''
         return a + b
 
-    @app.tool()
+    @app.tool(annotations=PURE_TOOL)
     def subtract(a: float, b: float) -> float:
         '''
         @desc     : Subtracts two numbers.
@@ -37,7 +211,7 @@ def register(app):
         '''
         return a - b
 
-    @app.tool()
+    @app.tool(annotations=PURE_TOOL)
     def multiply(a: float, b: float) -> float:
         '''
         @desc     : Multiplies two numbers.
@@ -47,7 +221,7 @@ def register(app):
         '''
         return a * b
 
-    @app.tool()
+    @app.tool(annotations=PURE_TOOL)
     def divide(a: float, b: float) -> float:
         '''
         @desc     : Divides two numbers.
@@ -58,3 +232,74 @@ def register(app):
         if b == 0:
             return float("inf")
         return a / b
+
+    @app.tool(annotations=PURE_TOOL)
+    def batch_elementwise(op: ElementwiseOp, a: List[float], b: List[float] | float) -> List[float]:
+        '''
+        @desc     : Applies add/subtract/multiply/divide elementwise in one call.
+        @param    : op (str): One of add, subtract, multiply, divide.
+                    a (List[float]): The left operands.
+                    b (List[float] | float): The right operands, same length as a, or a single number.
+        @return   : List[float]: The elementwise results. Division by zero is an error naming the positions.
+        '''
+        x, y = _as_array(a, "a"), _as_array(b, "b")
+        if y.ndim and y.shape != x.shape:
+            raise ValueError(f"length mismatch: a has {x.size} items, b has {y.size}")
+        with np.errstate(all="ignore"):
+            return _to_result(_fn(_ELEMENTWISE[op])(x, y))
+
+    @app.tool(annotations=PURE_TOOL)
+    def batch_reduce(op: ReduceOp, values: List[float], q: Optional[float] = None) -> float:
+        '''
+        @desc     : Reduces a list of numbers to a single value.
+        @param    : op (str): One of sum, mean, min, max, median, std, percentile.
+                    values (List[float]): The numbers to reduce.
+                    q (float, optional): Percentile in [0, 100], required when op is percentile.
+        @return   : float: The reduced value. Overflow (e.g. sum of huge numbers) is an error.
+        '''
+        x = _as_array(values, "values")
+        if op != "sum" and x.size == 0:
+            raise ValueError(f"{op} of an empty list is undefined")
+        if op == "percentile":
+            if q is None or not 0 <= q <= 100:
+                raise ValueError("percentile requires q in [0, 100]")
+            return _to_result(np.percentile(x, q))
+        with np.errstate(all="ignore"):
+            return _to_result(_fn(_REDUCE[op])(x))
+
+    @app.tool(annotations=PURE_TOOL)
+    def dot(a: List[float], b: List[float]) -> float:
+        '''
+        @desc     : Computes the dot product of two vectors.
+        @param    : a (List[float]): The first vector.
+                    b (List[float]): The second vector, same length as a.
+        @return   : float: The dot product.
+        '''
+        x, y = _as_array(a, "a"), _as_array(b, "b")
+        if x.shape != y.shape:
+            raise ValueError(f"length mismatch: a has {x.size} items, b has {y.size}")
+        with np.errstate(all="ignore"):
+            return _to_result(np.dot(x, y))
+
+    @app.tool(annotations=PURE_TOOL)
+    def evaluate(expression: str, variables: Optional[dict[str, List[float] | float]] = None) -> List[float] | float:
+        '''
+        @desc     : Evaluates an arithmetic expression over numbers and arrays in one vectorized call.
+                    Supports + - * / **, list literals and the functions
+                    sum, mean, min, max, median, std, abs, sqrt (one argument each), round(x[, decimals]),
+                    dot(a, b), percentile(x, q). Operands are numbers or flat lists.
+                    Example: "sum(price * qty) / sum(qty)" with variables {"price": [...], "qty": [...]}.
+        @param    : expression (str): The expression to evaluate.
+                    variables (dict, optional): Named numbers or arrays referenced by the expression.
+        @return   : List[float] | float: The result. Division by zero and other non-finite values
+                    (e.g. sqrt of a negative number) are an error naming the positions.
+        '''
+        if len(expression) > settings.MATH_MAX_EXPRESSION_LENGTH:
+            raise ValueError(f"expression longer than {settings.MATH_MAX_EXPRESSION_LENGTH} characters")
+        arrays = {name: _as_array(v, name) for name, v in (variables or {}).items()}
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"invalid expression: {e.msg}")
+        with np.errstate(all="ignore"):
+            return _to_result(_eval_node(tree, arrays))
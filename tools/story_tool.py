@@ -9,66 +9,253 @@
 """
 
 
+import asyncio
 import logging
 import traceback
 import json
-import httpx
-from setting import settings
-from common.types import Language, LANGUAGE_NAMES
+from common.image_cache import ImageURLCache, image_key
+from common.image_store import MIME_TYPES, ImageStore, parse_range
+from common.limiter import limiter
+from common.metrics import metrics
+from common.stream_json import SceneStreamParser
+from common.types import Language, LANGUAGE_NAMES, PURE_TOOL
+from common.upstream import upstream
 from mcp.server import FastMCP
-from openai import OpenAI
-from typing import Any, Dict, List
+from mcp.server.fastmcp import Context
+from setting import settings
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from typing import Any, AsyncIterator, Callable, Dict, List
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+IMAGE_MODEL = "cogview-3-flash"
+STORY_MODEL = "glm-4-flashx"
+
+# 进程内所有 generate_image 调用共享的生图并发上限
+_image_semaphore = asyncio.Semaphore(settings.IMAGE_MAX_CONCURRENCY)
+
+_image_cache = ImageURLCache(
+    settings.IMAGE_CACHE_DIR,
+    margin=settings.IMAGE_CACHE_MARGIN,
+    default_ttl=settings.IMAGE_CACHE_TTL,
+)
+
+_image_store = ImageStore(
+    settings.IMAGE_MIRROR_DIR if settings.IMAGE_MIRROR else "",
+    max_bytes=settings.IMAGE_MIRROR_MAX_BYTES,
+    chunk_size=settings.IMAGE_MIRROR_CHUNK,
+)
+
+
+def _normalize_resolution(resolution: str) -> str:
+    """
+    @desc     : 统一分辨率写法，如 "1024*1024" / "1024 X 1024" -> "1024x1024"
+    """
+    return "".join(resolution.split()).lower().replace("*", "x").replace("×", "x")
+
+
+async def _generate_one(prompt: str, resolution: str) -> str:
+    """
+    @desc     : 生成单张图片；开启 IMAGE_MIRROR 时下载到本地并返回 resource:// 地址，下载失败退回远程链接
+    @param    : prompt (str): 场景图片提示词
+    @param    : resolution (str): 分辨率，如 1024x1024
+    @return   : str: 图片链接
+    """
+    url = await _generate_url(prompt, resolution)
+    if _image_store.enabled:
+        try:
+            return await _image_store.mirror(url)
+        except Exception:
+            logger.warning(f"image mirror failed, fall back to remote url: {url}", exc_info=True)
+    return url
+
+
+async def _generate_url(prompt: str, resolution: str) -> str:
+    """
+    @desc     : 调用生图接口，相同 (model, prompt, resolution) 优先命中持久化缓存
+    @param    : prompt (str): 场景图片提示词
+    @param    : resolution (str): 分辨率，如 1024x1024
+    @return   : str: 远程图片链接
+    """
+    safe_prompt = (
+        f"Create a safe, family-friendly illustration. {prompt} "
+        "The image should be appropriate for all ages, non-violent, and non-controversial."
+    )
+    key = image_key(IMAGE_MODEL, safe_prompt, resolution)
+    url = await _image_cache.get(key)
+    if url:
+        logger.info(f"image cache hit: {url}")
+        return url
+
+    async with _image_semaphore:
+        response = await limiter.run(f"images:{IMAGE_MODEL}", lambda: upstream.async_openai.images.generate(
+            model=IMAGE_MODEL,
+            prompt=safe_prompt,
+            size=resolution,
+            quality="standard",
+            n=1,
+        ))
+    url = response.data[0].url
+    logger.info(f"image generate res: {url}")
+    await _image_cache.put(key, url)
+    return url
+
+
+async def _stream_scenes(story_prompt: str, parser: SceneStreamParser) -> AsyncIterator[Dict[str, Any]]:
+    """
+    @desc     : 流式调用 LLM 生成故事，逐个产出已完整解析的场景
+    @param    : story_prompt (str): 故事场景提示词
+    @param    : parser (SceneStreamParser): 增量解析器，流结束后可从中取完整结果
+    @return   : AsyncIterator[Dict]: 场景对象
+    """
+    messages = [
+        {"role": "system", "content": "你是一个专业的故事创作者，善于创作引人入胜的故事。请只返回JSON格式的内容。"},
+        {"role": "user", "content": story_prompt},
+    ]
+    # 流式响应在整个读取期间都占用一个并发配额
+    async with limiter.slot(f"chat:{STORY_MODEL}"):
+        stream = await upstream.async_openai.chat.completions.create(
+            model=STORY_MODEL,
+            response_format={"type": "json_object"},
+            messages=messages,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for scene in parser.feed(delta):
+                yield scene
+
+
+def _story_prompt(story_theme: str = None, language: Language = Language.CHINESE_CN, segments: int = 3) -> str:
+    """
+    @desc     : 拼装故事生成提示词，供 get_story_prompt 与 generate_illustrated_story 共用
+    """
+    languageValue = LANGUAGE_NAMES[language]
+    if story_theme:
+        base_prompt = f"讲一个故事，主题是：{story_theme}"
+    return f"""
+    {base_prompt}. The story needs to be divided into {segments} scenes, and each scene must include descriptive text and an image prompt.
+
+    Please return the result in the following JSON format, where the key `list` contains an array of objects:
+
+    **Expected JSON format**:
+    {{
+        "list": [
+            {{
+                "text": "Descriptive text for the scene",
+                "image_prompt": "Detailed image generation prompt, described in English"
+            }},
+            {{
+                "text": "Another scene description text",
+                "image_prompt": "Another detailed image generation prompt in English"
+            }}
+        ]
+    }}
+
+    **Requirements**:
+    1. The root object must contain a key named `list`, and its value must be an array of scene objects.
+    2. Each object in the `list` array must include:
+        - `text`: A descriptive text for the scene, written in {languageValue}.
+        - `image_prompt`: A detailed prompt for generating an image, written in English.
+    3. Ensure the JSON format matches the above example exactly. Avoid extra fields or incorrect key names like `cimage_prompt` or `inage_prompt`.
+
+    **Important**:
+    - If there is only one scene, the array under `list` should contain a single object.
+    - The output must be a valid JSON object. Do not include explanations, comments, or additional content outside the JSON.
+
+    Example output:
+    {{
+        "list": [
+            {{
+                "text": "Scene description text",
+                "image_prompt": "Detailed image generation prompt in English"
+            }}
+        ]
+    }}
+    """
+
 
 def register(app: FastMCP):
 
     @app.tool()
-    def generate_image(
+    async def generate_image(
         images_prompts: List[str],
         resolution: str = "1024x1024",
+        concurrency: int = settings.IMAGE_CONCURRENCY,
     ) -> list[str]:
         """
-        @desc     : 生成图片
+        @desc     : 并发生成图片，结果顺序与 images_prompts 一致
         @param    : images_prompts
         @param    : resolution 
-        @return   : 返回每个场景对应的图片链接
+        @param    : concurrency (int): 本次调用的最大并发数，同时受全局上限约束
+        @return   : 返回每个场景对应的图片链接，失败的场景返回 "ERROR: ..." 占位
         """
 
-        image_urls = []
         if resolution:
-            resolution = resolution.replace("*", "x")
+            resolution = _normalize_resolution(resolution)
+
+        call_semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _bounded(prompt: str) -> str:
+            async with call_semaphore:
+                try:
+                    return await _generate_one(prompt, resolution)
+                except Exception as e:
+                    logger.error(f"Failed to generate image: {e}\n{traceback.format_exc()}")
+                    metrics.count_error()
+                    return f"ERROR: {type(e).__name__}: {str(e)[:200]}"
+
+        return list(await asyncio.gather(*(_bounded(p) for p in images_prompts)))
+
+    @app.resource("stats://image_cache")
+    def image_cache_stats() -> dict:
+        """生图缓存命中与本地镜像统计"""
+        return {**_image_cache.stats(), "mirror": _image_store.stats()}
+
+    def _mirrored_image(ext: str) -> Callable[[str], bytes]:
+        def mirrored_image(name: str) -> bytes:
+            """本地镜像的图片内容"""
+            # MCP 资源以 base64 整体返回，这里只能复制一次；大图请走 HTTP /images/{name} 分段读取
+            with _image_store.open(f"{name}.{ext}") as mm:
+                return mm[:]
+        return mirrored_image
 
-        llm_client = OpenAI(
-            api_key=settings.API_KEY,
-            base_url="https://open.bigmodel.cn/api/paas/v4",
-            http_client=httpx.Client(proxy=settings.PROXY) if settings.PROXY else None,
+    # 镜像可能是 png / jpg / webp / gif：资源模板的 MIME 类型是固定的，因此每种扩展名注册一个模板
+    for ext, mime_type in MIME_TYPES.items():
+        app.resource(f"resource://images/{{name}}.{ext}", name=f"mirrored_image_{ext}", mime_type=mime_type)(
+            _mirrored_image(ext)
         )
-        try:
-            for prompt in images_prompts:
-                safe_prompt = (
-                    f"Create a safe, family-friendly illustration. {prompt} "
-                    "The image should be appropriate for all ages, non-violent, and non-controversial."
-                )
-                response = llm_client.images.generate(
-                    model="cogview-3-flash",
-                    prompt=safe_prompt,
-                    size=resolution,
-                    quality="standard",
-                    n=1,
-                )
-                url = response.data[0].url
-                image_urls.append(url)
-                logger.info(f"image generate res: {url}")
 
-        except Exception as e:
-            logger.error(f"Failed to generate image: {e}\n{traceback.format_exc()}")
-            return ""
-        return image_urls
+    @app.custom_route("/images/{name}", methods=["GET"])
+    async def mirrored_image_file(request: Request) -> Response:
+        name = request.path_params["name"]
+        try:
+            size = _image_store.size(name)
+        except FileNotFoundError:
+            return Response(status_code=404)
+        span = parse_range(request.headers.get("range"), size)
+        if span is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end = span
+        headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+        status = 200
+        if request.headers.get("range"):
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+            status = 206
+        return StreamingResponse(
+            _image_store.iter_range(name, start, end),
+            status_code=status,
+            headers=headers,
+            media_type=MIME_TYPES[name.rsplit(".", 1)[1]],
+        )
 
-    @app.tool()
+    @app.tool(annotations=PURE_TOOL)
     def get_story_prompt(
         story_theme: str = None,
         language: Language = Language.CHINESE_CN,
@@ -80,70 +267,78 @@ def register(app: FastMCP):
         @param    : segments (int, optional): 故事分段数. Defaults to 3.
         @return   : 完整的提示词
         """
-        languageValue = LANGUAGE_NAMES[language]
-        if story_theme:
-            base_prompt = f"讲一个故事，主题是：{story_theme}"
-        return f"""
-        {base_prompt}. The story needs to be divided into {segments} scenes, and each scene must include descriptive text and an image prompt.
-
-        Please return the result in the following JSON format, where the key `list` contains an array of objects:
-
-        **Expected JSON format**:
-        {{
-            "list": [
-                {{
-                    "text": "Descriptive text for the scene",
-                    "image_prompt": "Detailed image generation prompt, described in English"
-                }},
-                {{
-                    "text": "Another scene description text",
-                    "image_prompt": "Another detailed image generation prompt in English"
-                }}
-            ]
-        }}
-
-        **Requirements**:
-        1. The root object must contain a key named `list`, and its value must be an array of scene objects.
-        2. Each object in the `list` array must include:
-            - `text`: A descriptive text for the scene, written in {languageValue}.
-            - `image_prompt`: A detailed prompt for generating an image, written in English.
-        3. Ensure the JSON format matches the above example exactly. Avoid extra fields or incorrect key names like `cimage_prompt` or `inage_prompt`.
-
-        **Important**:
-        - If there is only one scene, the array under `list` should contain a single object.
-        - The output must be a valid JSON object. Do not include explanations, comments, or additional content outside the JSON.
-
-        Example output:
-        {{
-            "list": [
-                {{
-                    "text": "Scene description text",
-                    "image_prompt": "Detailed image generation prompt in English"
-                }}
-            ]
-        }}
-        """
+        return _story_prompt(story_theme, language, segments)
 
     @app.tool()
-    async def generate_story(story_prompt: str):
+    async def generate_story(story_prompt: str, ctx: Context):
         '''
-        @desc     : 根据故事提示词生成故事的每个场景
+        @desc     : 根据故事提示词流式生成故事的每个场景，每完成一个场景即通过 progress 通知推送
         @param    : story_prompt (str): 故事场景提示词
         @return   : List[Dict[str, Any]]: 故事场景列表
         '''
+        parser = SceneStreamParser()
+        scenes = []
+        async for scene in _stream_scenes(story_prompt, parser):
+            scenes.append(scene)
+            await ctx.report_progress(len(scenes), None, json.dumps(scene, ensure_ascii=False))
+        return parser.result(scenes)
 
-        llm_client = OpenAI(api_key=settings.API_KEY, base_url="https://open.bigmodel.cn/api/paas/v4", http_client=httpx.Client(proxy=settings.PROXY))
+    @app.tool()
+    async def generate_illustrated_story(
+        story_theme: str,
+        ctx: Context,
+        language: Language = Language.CHINESE_CN,
+        segments: int = 3,
+        resolution: str = "1024x1024",
+    ):
+        '''
+        @desc     : 一次完成“提示词 → 故事 → 配图”。故事流式生成，每解析出一个场景立即开始生图，
+                    场景配图完成即通过 progress 通知推送（message 为带 index 与 image_url 的场景 JSON）
+        @param    : story_theme (str): 故事主题
+        @param    : language (Language): 故事文本语言
+        @param    : segments (int): 故事分段数
+        @param    : resolution (str): 图片分辨率
+        @return   : Dict: {"list": [{"text", "image_prompt", "image_url"}, ...]}，生图失败的场景 image_url 为 "ERROR: ..." 占位
+        '''
+        resolution = _normalize_resolution(resolution)
+        call_semaphore = asyncio.Semaphore(max(1, settings.IMAGE_CONCURRENCY))
+        progress_lock = asyncio.Lock()
+        finished = 0
 
-        messages = [
-            {"role": "system", "content": "你是一个专业的故事创作者，善于创作引人入胜的故事。请只返回JSON格式的内容。"},
-            {"role": "user", "content": story_prompt},
-        ]
+        async def _illustrate(index: int, scene: Dict[str, Any]):
+            nonlocal finished
+            prompt = scene.get("image_prompt")
+            if prompt:
+                async with call_semaphore:
+                    try:
+                        scene["image_url"] = await _generate_one(prompt, resolution)
+                    except Exception as e:
+                        logger.error(f"Failed to generate image: {e}\n{traceback.format_exc()}")
+                        metrics.count_error()
+                        scene["image_url"] = f"ERROR: {type(e).__name__}: {str(e)[:200]}"
+            else:
+                scene["image_url"] = None
+            async with progress_lock:
+                finished += 1
+                await ctx.report_progress(
+                    finished, max(segments, finished), json.dumps({"index": index, **scene}, ensure_ascii=False)
+                )
 
-        response = llm_client.chat.completions.create(
-            model="glm-4-flashx",
-            response_format={"type": "json_object"},
-            messages=messages,
-        )
-        content = response.choices[0].message.content
-        result = json.loads(content)
-        return result
+        parser = SceneStreamParser()
+        scenes: List[Dict[str, Any]] = []
+        tasks: List[asyncio.Task] = []
+        try:
+            async for scene in _stream_scenes(_story_prompt(story_theme, language, segments), parser):
+                scenes.append(scene)
+                tasks.append(asyncio.create_task(_illustrate(len(scenes) - 1, scene)))
+            if not scenes:
+                # 输出结构不符合增量解析约定时，退回到完整文本解析后再统一生图
+                for scene in parser.result(scenes).get("list", []):
+                    scenes.append(scene)
+                    tasks.append(asyncio.create_task(_illustrate(len(scenes) - 1, scene)))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        return {"list": scenes}
@@ -8,58 +8,156 @@
 @Desc    :   None
 '''
 
-import logging
-import traceback
 import httpx
+import logging
+import unicodedata
+from typing import Optional
+from common.cache import AsyncTTLCache
+from common.hedge import Hedger
+from common.limiter import UpstreamBusy, limiter
+from common.metrics import metrics
+from common.search_results import parse_sources, select_snippets
+from common.semantic_cache import SemanticCache
+from common.upstream import upstream
 from setting import settings
 
+
+class SearchHTTPError(Exception):
+    """上游返回非 200，不进入缓存"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"HTTP {status_code}: {text[:500]}")
+        self.status_code = status_code
+
+
+_cache = AsyncTTLCache(ttl=settings.SEARCH_CACHE_TTL, maxsize=settings.SEARCH_CACHE_SIZE)
+# 第二级缓存：精确键未命中时按近似查询查找
+_semantic = SemanticCache(
+    capacity=settings.SEMANTIC_CACHE_SIZE,
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    ttl=settings.SEMANTIC_CACHE_TTL,
+    strict=settings.SEMANTIC_CACHE_STRICT,
+)
+_hedger = Hedger(
+    enabled=settings.SEARCH_HEDGE,
+    percentile=settings.SEARCH_HEDGE_PERCENTILE,
+    budget=settings.SEARCH_HEDGE_BUDGET,
+    window=settings.SEARCH_HEDGE_WINDOW,
+    min_samples=settings.SEARCH_HEDGE_MIN_SAMPLES,
+)
+
+
+def normalize_query(query: str) -> str:
+    """
+    @desc     : 归一化查询作为缓存键：全角转半角、大小写折叠、合并空白
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+async def _search(query: str) -> dict:
+    """
+    @desc     : 调用 web-search-pro
+    @param    : query (str): 搜索内容
+    @return   : dict: {"sources": [{"title", "url", "content"}]}，缓存的是未裁剪的完整来源
+    """
+    api_key = settings.API_KEY
+    header_value = f"Bearer {api_key}" if api_key else ""
+    headers = {"Authorization": header_value}
+
+    payload = {
+        "tool": "web-search-pro",
+        "messages": [{"role": "user", "content": query}],
+        "stream": False
+    }
+
+    resp = await limiter.run("tools:web-search-pro", lambda: upstream.async_client.post(
+        f"{settings.BIGMODEL_BASE_URL}/tools",
+        headers=headers,
+        json=payload,
+        timeout=settings.SEARCH_TIMEOUT,
+    ))
+
+    if resp.status_code != 200:
+        raise SearchHTTPError(resp.status_code, resp.text)
+
+    return {"sources": parse_sources(resp.json())}
+
+
 def register(app):
     @app.tool()
-    async def web_search(query: str) -> dict:
+    async def web_search(
+        query: str,
+        max_results: int = settings.SEARCH_MAX_RESULTS,
+        max_chars: int = settings.SEARCH_MAX_CHARS,
+        max_tokens: Optional[int] = None,
+    ) -> dict:
         """
             搜索互联网内容
 
             Args:
                 query: 要搜索内容
+                max_results: 最多返回的来源数
+                max_chars: 返回内容的总字符预算
+                max_tokens: 返回内容的总 token 预算（可选，与 max_chars 同时生效）
 
             Returns:
-                搜索结果的总结
+                {"query": ..., "sources": [{"title", "url", "snippet"}]}，按相关度排序；
+                失败时为 {"error": 错误码}，如 upstream_http_429、upstream_busy、upstream_timeout
         """
         try:
             logging.info(f"web_search called. query={query!r}")
+            key = normalize_query(query)
+            found = _cache.lookup(key)
+            if found is None:
+                found = _semantic.get(key)
+            if found is None:
+
+                async def _load():
+                    result = await _hedger.run(lambda: _search(query))
+                    _semantic.add(key, result)
+                    return result
+
+                found = await _cache.get_or_load(key, _load)
 
-            api_key = settings.API_KEY
-            header_value = f"Bearer {api_key}" if api_key else ""
-            headers = {"Authorization": header_value}
-
-            payload = {
-                "tool": "web-search-pro",
-                "messages": [{"role": "user", "content": query}],
-                "stream": False
-            }
-
-            async with httpx.AsyncClient(
-                proxy=settings.PROXY,
-                timeout=30.0
-            ) as client:
-                resp = await client.post(
-                    "https://open.bigmodel.cn/api/paas/v4/tools",
-                    headers=headers,
-                    json=payload
-                )
-
-            if resp.status_code != 200:
-                return {"result": f"HTTP {resp.status_code}: {resp.text[:500]}"}
-
-            j = resp.json()
-            choices = j.get("choices", [])
-            result = "\n\n".join(
-                c.get("message", {}).get("content", "")
-                for c in choices if c.get("message")
+            sources = select_snippets(
+                query,
+                found["sources"],
+                max_results=max(1, min(max_results, 20)),
+                max_chars=max(200, max_chars),
+                max_tokens=max(50, max_tokens) if max_tokens else None,
             )
-            return {"result": result or str(j)[:1000]}
+            return {"query": query, "sources": sources}
+
+        except SearchHTTPError as e:
+            metrics.count_error()
+            logging.warning(f"web_search upstream error: {e}")
+            return {"error": f"upstream_http_{e.status_code}"}
+
+        except UpstreamBusy as e:
+            metrics.count_error()
+            return {"error": "upstream_busy", "retry_after": round(e.retry_after)}
+
+        except httpx.TimeoutException:
+            metrics.count_error()
+            return {"error": "upstream_timeout"}
+
+        except httpx.TransportError:
+            metrics.count_error()
+            logging.warning("web_search upstream unreachable", exc_info=True)
+            return {"error": "upstream_unreachable"}
+
+        except ValueError:
+            metrics.count_error()
+            logging.warning("web_search bad upstream response", exc_info=True)
+            return {"error": "bad_response"}
 
         except Exception:
-            tb = traceback.format_exc()
+            metrics.count_error()
+            # 完整堆栈只记日志，不进入模型上下文
             logging.error("web_search 异常", exc_info=True)
-            return {"result": f"EXCEPTION: {tb}"}
+            return {"error": "internal_error"}
+
+    @app.resource("stats://web_search")
+    def web_search_stats() -> dict:
+        """web_search 缓存命中与对冲统计"""
+        return {"exact": _cache.stats(), "semantic": _semantic.stats(), "hedge": _hedger.stats()}